@@ -0,0 +1,4 @@
+"""Offline benchmarks for simple_django_api.
+
+Run from the repository root, e.g. ``python -m benchmarks.json_backends``.
+"""
@@ -0,0 +1,96 @@
+"""Compare JSON backends on typical API payload shapes
+
+    python -m benchmarks.json_backends [--number N] [--json]
+"""
+import argparse
+from datetime import datetime, timedelta
+from decimal import Decimal
+import json
+import timeit
+import uuid
+
+from simple_django_api.utils import json as json_utils
+
+
+def make_record(i):
+    return {
+        'id': i,
+        'uuid': str(uuid.UUID(int=i)),
+        'name': f'user {i}',
+        'email': f'user{i}@example.com',
+        'is_active': i % 2 == 0,
+        'score': i * 1.5,
+        'tags': ['a', 'b', 'c'],
+    }
+
+
+def make_rich_record(i):
+    record = make_record(i)
+    record['uuid'] = uuid.UUID(int=i)
+    record['created'] = datetime(2021, 1, 1) + timedelta(minutes=i)
+    record['price'] = Decimal(i) / 100
+    return record
+
+
+PAYLOADS = {
+    'detail': {'detail': 'not found'},
+    'object': make_record(1),
+    'list_100': [make_record(i) for i in range(100)],
+    'list_10k': [make_record(i) for i in range(10000)],
+    'rich_list_100': [make_rich_record(i) for i in range(100)],
+    'nested': {
+        'count': 100,
+        'results': [{
+            **make_record(i), 'children': [make_record(j) for j in range(5)]
+        } for i in range(100)],
+    },
+}
+
+
+def available_backends():
+    for name in json_utils.BACKENDS:
+        try:
+            yield name, json_utils.load_backend(name)
+        except ImportError:
+            pass
+
+
+def bench(func, number):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def run(number):
+    results = []
+    for payload_name, payload in PAYLOADS.items():
+        for backend_name, backend in available_backends():
+            content = backend.dumps(payload)
+            dumps_time = bench(lambda: backend.dumps(payload), number)
+            loads_time = bench(lambda: backend.loads(content), number)
+            results.append({
+                'payload': payload_name,
+                'backend': backend_name,
+                'size': len(content),
+                'dumps_us': dumps_time * 1e6,
+                'loads_us': loads_time * 1e6,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help='output json')
+    args = parser.parse_args()
+    results = run(args.number)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f'{"payload":<15}{"backend":<10}{"bytes":>10}'
+          f'{"dumps(us)":>14}{"loads(us)":>14}')
+    for item in results:
+        print(f'{item["payload"]:<15}{item["backend"]:<10}{item["size"]:>10}'
+              f'{item["dumps_us"]:>14.1f}{item["loads_us"]:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Measure JWT encode, decode, token extraction and authentication
+
+    python -m benchmarks.jwt_auth [--number N] [--json]
+
+RS256, ES256 and EdDSA are skipped unless ``cryptography`` is installed.
+"""
+import argparse
+import json
+import timeit
+
+import django
+from django.conf import settings
+
+settings.configure(
+    DATABASES={
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+    },
+    INSTALLED_APPS=['django.contrib.auth', 'django.contrib.contenttypes'],
+    API_JWT_SECRET_KEY='benchmark secret',
+    API_JWT_EXPIRATION_MINUTES=60,
+)
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.http import HttpRequest  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from simple_django_api.jwt import auth  # noqa: E402
+
+SMALL_CLAIMS = {'username': 'john'}
+LARGE_CLAIMS = {
+    'username': 'john',
+    'email': 'john@example.com',
+    'roles': [f'role-{i}' for i in range(20)],
+    'permissions': [f'app.perm_{i}' for i in range(200)],
+    'profile': {f'field_{i}': f'value {i}' for i in range(50)},
+}
+CLAIMS = {'small': SMALL_CLAIMS, 'large': LARGE_CLAIMS}
+
+
+def generate_keys():
+    """`API_JWT_KEYS` for every available algorithm, kid is the algorithm
+    """
+    keys = {'HS256': {'key': 'benchmark secret', 'algorithm': 'HS256'}}
+    try:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+    except ImportError:
+        return keys
+    private_keys = {
+        'RS256': rsa.generate_private_key(public_exponent=65537,
+                                          key_size=2048),
+        'ES256': ec.generate_private_key(ec.SECP256R1()),
+        'EdDSA': ed25519.Ed25519PrivateKey.generate(),
+    }
+    for algorithm, private_key in private_keys.items():
+        pem = private_key.private_bytes(serialization.Encoding.PEM,
+                                        serialization.PrivateFormat.PKCS8,
+                                        serialization.NoEncryption())
+        keys[algorithm] = {'key': pem, 'algorithm': algorithm}
+    return keys
+
+
+def make_request(token, cookie):
+    request = HttpRequest()
+    if cookie:
+        request.COOKIES[cookie] = f'Bearer {token}'
+    else:
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return request
+
+
+def bench(func, number):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def run(number):
+    call_command('migrate', verbosity=0)
+    user = get_user_model().objects.create_user('john')
+    keys = generate_keys()
+    results = []
+
+    def record(op, algorithm, claims, source, cache, func, size):
+        results.append({
+            'op': op,
+            'algorithm': algorithm,
+            'claims': claims,
+            'source': source,
+            'cache': cache,
+            'size': size,
+            'us': bench(func, number) * 1e6,
+        })
+
+    for algorithm in keys:
+        for claims_name, claims in CLAIMS.items():
+            payload = {'sub': user.pk, **claims}
+            with override_settings(API_JWT_KEYS=keys,
+                                   API_JWT_SIGNING_KID=algorithm):
+                token = auth.encode(payload)
+                size = len(token)
+                record('encode', algorithm, claims_name, '', '',
+                       lambda: auth.encode(payload), size)
+                with override_settings(API_JWT_DECODE_CACHE_SIZE=0):
+                    record('decode', algorithm, claims_name, '', 'cold',
+                           lambda: auth.decode(token), size)
+                auth.decode(token)
+                record('decode', algorithm, claims_name, '', 'warm',
+                       lambda: auth.decode(token), size)
+
+    token = auth.generate_token(user)
+    for source, cookie in (('header', ''), ('cookie', 'token')):
+        request = make_request(token, cookie)
+        with override_settings(API_JWT_AUTH_COOKIE=cookie):
+            record('get_token_from_request', 'HS256', 'small', source, '',
+                   lambda: auth.get_token_from_request(request), len(token))
+            with override_settings(API_JWT_DECODE_CACHE_SIZE=0):
+                record('authenticate', 'HS256', 'small', source, 'cold',
+                       lambda: auth.authenticate(request), len(token))
+            with override_settings(API_JWT_USER_CACHE_BACKEND='local'):
+                auth.authenticate(request)
+                record('authenticate', 'HS256', 'small', source, 'warm',
+                       lambda: auth.authenticate(request), len(token))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=200)
+    parser.add_argument('--json', action='store_true', help='output json')
+    args = parser.parse_args()
+    results = run(args.number)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f'{"op":<24}{"algorithm":<10}{"claims":<8}{"source":<8}'
+          f'{"cache":<6}{"bytes":>7}{"time(us)":>12}')
+    for item in results:
+        print(f'{item["op"]:<24}{item["algorithm"]:<10}{item["claims"]:<8}'
+              f'{item["source"]:<8}{item["cache"]:<6}{item["size"]:>7}'
+              f'{item["us"]:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Response cache of GET views
+
+A view with a `cache = CachePolicy(...)` policy stores rendered
+responses and serves them again until `ttl` expires, permissions of the
+view are still checked before a cached response is returned.
+"""
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import cc_delim_re
+from django.utils.http import urlencode
+
+from .utils.cache import LRUCache
+
+VARY_ON = ('query', 'user')
+CACHEABLE_METHODS = ('GET', 'HEAD')
+
+
+def get_user_key(request):
+    """JWT subject if `jwt_info` is set by the middleware, else user pk,
+    `anonymous` if the request is not authenticated
+    """
+    jwt_info = getattr(request, 'jwt_info', None)
+    if jwt_info is not None:
+        # only set by the JWT middleware, PyJWT is installed
+        from .jwt.auth import get_jwt_config
+        payload = jwt_info['payload'] or {}
+        user_pk = payload.get(get_jwt_config().user_pk_key)
+        if user_pk is None:
+            return 'anonymous'
+        return f'sub:{user_pk}'
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return 'anonymous'
+    return f'pk:{user.pk}'
+
+
+def is_cacheable(response):
+    """Only complete 200 responses without cookies nor private data
+    """
+    if response.streaming or response.status_code != 200:
+        return False
+    if response.cookies or response.has_header('Set-Cookie'):
+        return False
+    cache_control = {
+        directive.split('=', 1)[0].strip().lower()
+        for directive in cc_delim_re.split(response.get('Cache-Control', ''))
+    }
+    return not cache_control & {'no-store', 'no-cache', 'private'}
+
+
+class CachePolicy:
+    """Cache policy of a view
+
+    Responses are cached for `ttl` seconds, keyed by path and negotiated
+    renderer, plus sorted query params and user (or JWT subject) for
+    each name in `vary`. Leave out `user` only for responses shared by
+    every user. `backend` is the alias of a Django cache, by
+    default an in-process LRU cache of `maxsize` responses is used.
+    """
+    def __init__(self,
+                 *,
+                 ttl=60,
+                 vary=VARY_ON,
+                 backend=None,
+                 maxsize=1024,
+                 key_prefix='simple_django_api:response:'):
+        unknown = set(vary) - set(VARY_ON)
+        if unknown:
+            raise ValueError(f'cannot vary on {", ".join(sorted(unknown))}')
+        self.ttl = ttl
+        self.vary = frozenset(vary)
+        self.backend = backend
+        self.key_prefix = key_prefix
+        self._local = LRUCache(maxsize) if backend is None else None
+
+    @property
+    def cache(self):
+        if self._local is not None:
+            return self._local
+        return caches[self.backend]
+
+    def get_key(self, request, renderer):
+        parts = [request.path, renderer.media_type]
+        if 'query' in self.vary:
+            parts.append(urlencode(sorted(request.GET.lists()), doseq=True))
+        if 'user' in self.vary:
+            parts.append(get_user_key(request))
+        digest = hashlib.blake2b('\n'.join(parts).encode(),
+                                 digest_size=16).hexdigest()
+        return f'{self.key_prefix}{digest}'
+
+    def _needs_thread(self, request):
+        # resolving `request.user` may query the database
+        return 'user' in self.vary and getattr(request, 'jwt_info',
+                                               None) is None
+
+    @staticmethod
+    def _build_response(entry):
+        status, content, headers = entry
+        response = HttpResponse(content, status=status)
+        for header, value in headers:
+            response[header] = value
+        return response
+
+    @staticmethod
+    def _make_entry(response):
+        return (response.status_code, response.content,
+                list(response.items()))
+
+    def get_response(self, request, renderer):
+        """Cached response of request, `None` on miss,
+        a miss marks the request so `store` saves its response
+        """
+        if request.method not in CACHEABLE_METHODS:
+            return None
+        key = self.get_key(request, renderer)
+        entry = self.cache.get(key)
+        if entry is None:
+            request._api_cache_key = key
+            return None
+        return self._build_response(entry)
+
+    def store(self, request, response):
+        key = getattr(request, '_api_cache_key', None)
+        if key is None or not is_cacheable(response):
+            return
+        request._api_cache_key = None
+        self.cache.set(key, self._make_entry(response), timeout=self.ttl)
+
+    async def aget_response(self, request, renderer):
+        if self._local is None or self._needs_thread(request):
+            return await sync_to_async(self.get_response)(request, renderer)
+        # in memory, safe to call on the event loop
+        return self.get_response(request, renderer)
+
+    async def astore(self, request, response):
+        if self._local is None and getattr(request, '_api_cache_key',
+                                           None) is not None:
+            await sync_to_async(self.store)(request, response)
+        else:
+            self.store(request, response)
+
+    def clear(self):
+        """Drop every response of the in-process cache,
+        entries of a Django cache expire after `ttl`
+        """
+        if self._local is not None:
+            self._local.clear()
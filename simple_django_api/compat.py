@@ -1,4 +1,34 @@
+import asyncio
+
 try:
     import ujson as json  # noqa: F401
 except ImportError:
     import json  # noqa: F401
+
+try:
+    from asgiref.sync import markcoroutinefunction  # noqa: F401
+except ImportError:
+
+    def markcoroutinefunction(func):
+        func._is_coroutine = asyncio.coroutines._is_coroutine
+        return func
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
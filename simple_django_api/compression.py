@@ -0,0 +1,167 @@
+"""Per view response compression negotiated by `Accept-Encoding`
+
+.. code:: python
+
+    class UserListView(APIView):
+        compression = Compression(min_size=1024, levels={'gzip': 5})
+
+`br` and `zstd` are available when `brotli` / `zstandard` is installed.
+Only enable compression on views whose responses do not mix secrets
+with user controlled input (BREACH).
+"""
+import functools
+import zlib
+
+from django.utils.cache import patch_vary_headers
+
+from . import compat
+
+
+class BaseCompressor:
+    encoding = None
+    default_level = None
+
+    def __init__(self, level=None):
+        self.level = self.default_level if level is None else level
+
+    def compress(self, data):
+        raise NotImplementedError()
+
+    def compress_stream(self, chunks):
+        """Compress chunks, flushing after each of them
+        so the client receives data as it is produced
+        """
+        raise NotImplementedError()
+
+
+class GzipCompressor(BaseCompressor):
+    encoding = 'gzip'
+    default_level = 6
+
+    def _compressobj(self):
+        return zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        compressor = self._compressobj()
+        return compressor.compress(data) + compressor.flush()
+
+    def compress_stream(self, chunks):
+        compressor = self._compressobj()
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(
+                zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+class BrotliCompressor(BaseCompressor):
+    encoding = 'br'
+    default_level = 5
+
+    def compress(self, data):
+        return compat.brotli.compress(data, quality=self.level)
+
+    def compress_stream(self, chunks):
+        compressor = compat.brotli.Compressor(quality=self.level)
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+
+
+class ZstdCompressor(BaseCompressor):
+    encoding = 'zstd'
+    default_level = 3
+
+    def compress(self, data):
+        return compat.zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def compress_stream(self, chunks):
+        compressor = compat.zstandard.ZstdCompressor(
+            level=self.level).compressobj()
+        flush_block = compat.zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(flush_block)
+        yield compressor.flush()
+
+
+COMPRESSORS = {GzipCompressor.encoding: GzipCompressor}
+if compat.brotli is not None:
+    COMPRESSORS[BrotliCompressor.encoding] = BrotliCompressor
+if compat.zstandard is not None:
+    COMPRESSORS[ZstdCompressor.encoding] = ZstdCompressor
+
+
+@functools.lru_cache(maxsize=256)
+def parse_accept_encoding(header):
+    """Return `{encoding: quality}` of `Accept-Encoding` header,
+    results are cached per distinct header
+    """
+    accepted = {}
+    for token in header.split(','):
+        encoding, _, params = token.partition(';')
+        encoding = encoding.strip().lower()
+        if not encoding:
+            continue
+        quality = 1.0
+        key, _, value = params.partition('=')
+        if key.strip().lower() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                pass
+        accepted[encoding] = quality
+    return accepted
+
+
+class Compression:
+    """Compression policy of a view
+
+    `encodings` are in order of preference, unavailable ones are ignored.
+    Bodies smaller than `min_size` bytes are not compressed,
+    `levels` maps encoding to compression level.
+    """
+    def __init__(self,
+                 *,
+                 encodings=('zstd', 'br', 'gzip'),
+                 min_size=1024,
+                 levels=None):
+        levels = levels or {}
+        self.min_size = min_size
+        self.compressors = [
+            COMPRESSORS[encoding](levels.get(encoding))
+            for encoding in encodings if encoding in COMPRESSORS
+        ]
+
+    def negotiate(self, accept_encoding):
+        accepted = parse_accept_encoding(accept_encoding)
+        for compressor in self.compressors:
+            quality = accepted.get(compressor.encoding, accepted.get('*', 0))
+            if quality > 0:
+                return compressor
+        return None
+
+    def apply(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding', ))
+        compressor = self.negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if compressor is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compressor.compress_stream(
+                response.streaming_content)
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            if len(response.content) < self.min_size:
+                return response
+            content = compressor.compress(response.content)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = compressor.encoding
+        return response
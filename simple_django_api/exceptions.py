@@ -59,3 +59,8 @@ class Forbidden(APIError):
 class NotFound(APIError):
     status_code = HTTPStatus.NOT_FOUND
     logging_level = logging.WARNING
+
+
+class NotAcceptable(APIError):
+    status_code = HTTPStatus.NOT_ACCEPTABLE
+    logging_level = logging.WARNING
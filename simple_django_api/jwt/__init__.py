@@ -1 +1,7 @@
-from .auth import generate_token  # noqa: F401
+import django
+
+from .auth import (generate_refresh_token, generate_token,  # noqa: F401
+                   generate_tokens)
+
+if django.VERSION < (3, 2):
+    default_app_config = 'simple_django_api.jwt.apps.JwtAppConfig'
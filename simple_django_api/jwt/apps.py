@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class JwtAppConfig(AppConfig):
+    name = 'simple_django_api.jwt'
+    label = 'simple_django_api_jwt'
+    verbose_name = 'JWT'
+    default_auto_field = 'django.db.models.AutoField'
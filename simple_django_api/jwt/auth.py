@@ -1,13 +1,40 @@
-from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+import hashlib
+import itertools
+import time
+import uuid
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.utils.functional import SimpleLazyObject
+from django.core.signals import setting_changed
+from django.db.models import QuerySet
+from django.dispatch import receiver
 import jwt
 
 from .settings import settings
-from .consts import TokenCase
-from ..utils.string import ensure_str
+from .consts import REFRESH_TOKEN_TYPE, TokenCase
+from .keys import get_key_ring
+from .revocation import is_revoked
+from .token_user import TokenUser
+from .user_cache import get_user_cache
+from ..utils import jws
+from ..utils.cache import LRUCache
+from ..utils.string import ensure_bytes, ensure_str
+
+
+def fetch_user(user_pk):
+    """Query user by pk, projected by `API_JWT_USER_ONLY`
+    and `API_JWT_USER_SELECT_RELATED`
+    """
+    queryset = get_user_model().objects.all()
+    if settings.API_JWT_USER_SELECT_RELATED:
+        queryset = queryset.select_related(
+            *settings.API_JWT_USER_SELECT_RELATED)
+    if settings.API_JWT_USER_ONLY:
+        queryset = queryset.only(*settings.API_JWT_USER_ONLY)
+    return queryset.filter(pk=user_pk).first()
 
 
 def get_user(user_pk=None):
@@ -18,11 +45,34 @@ def get_user(user_pk=None):
     from django.contrib.auth.models import AnonymousUser
     user = None
     if user_pk:
-        user = get_user_model().objects.filter(pk=user_pk).first()
+        user_cache = get_user_cache()
+        if user_cache is not None:
+            user = user_cache.get(user_pk)
+        if user is None:
+            user = fetch_user(user_pk)
+            if user is not None and user_cache is not None:
+                user_cache.set(user_pk, user)
     return user or AnonymousUser()
 
 
-@dataclass
+async def aget_user(user_pk=None):
+    """Async counterpart of `get_user`, the user cache is read
+    without blocking and only the query runs in a thread
+    """
+    from django.contrib.auth.models import AnonymousUser
+    user = None
+    if user_pk:
+        user_cache = get_user_cache()
+        if user_cache is not None:
+            user = await user_cache.aget(user_pk)
+        if user is None:
+            user = await sync_to_async(fetch_user)(user_pk)
+            if user is not None and user_cache is not None:
+                await user_cache.aset(user_pk, user)
+    return user or AnonymousUser()
+
+
+@dataclass(frozen=True)
 class JwtConfig:
     key: str
     algorithm: str
@@ -32,45 +82,106 @@ class JwtConfig:
     user_pk_key: str
 
 
+_jwt_config = None
+
+
 def get_jwt_config():
-    return JwtConfig(
-        key=settings.API_JWT_SECRET_KEY,
-        algorithm=settings.API_JWT_ALGORITHM,
-        verify_exp=settings.API_JWT_VERIFY_EXPIRATION,
-        auth_cookie=settings.API_JWT_AUTH_COOKIE,
-        expiration_minutes=settings.API_JWT_EXPIRATION_MINUTES,
-        user_pk_key='sub',
-    )
+    """Config built from settings, rebuilt after a `API_JWT_*` change
+    """
+    global _jwt_config
+    if _jwt_config is None:
+        _jwt_config = JwtConfig(
+            key=settings.API_JWT_SECRET_KEY,
+            algorithm=settings.API_JWT_ALGORITHM,
+            verify_exp=settings.API_JWT_VERIFY_EXPIRATION,
+            auth_cookie=settings.API_JWT_AUTH_COOKIE,
+            expiration_minutes=settings.API_JWT_EXPIRATION_MINUTES,
+            user_pk_key='sub',
+        )
+    return _jwt_config
 
 
-JWT_CONFIG = SimpleLazyObject(get_jwt_config)
+def __getattr__(name):
+    # `JWT_CONFIG` used to be a lazy object, keep it readable
+    if name == 'JWT_CONFIG':
+        return get_jwt_config()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def encode(payload: dict) -> str:
     """Accept payload and generate token string
     """
-    token = jwt.encode(payload, JWT_CONFIG.key, JWT_CONFIG.algorithm)
+    key = get_key_ring().get_signing_key()
+    headers = {'kid': key.kid} if key.kid is not None else None
+    token = jwt.encode(payload,
+                       key.signing_key,
+                       key.algorithm,
+                       headers=headers)
     return ensure_str(token)
 
 
-def decode(token: str) -> dict:
-    """receive token and get payload
+_decode_cache = None
+
+
+def get_decode_cache():
+    """LRU cache of verified payloads keyed by token digest,
+    `None` if `API_JWT_DECODE_CACHE_SIZE` is 0
     """
-    options = {'verify_exp': JWT_CONFIG.verify_exp}
+    global _decode_cache
+    if _decode_cache is None and settings.API_JWT_DECODE_CACHE_SIZE:
+        _decode_cache = LRUCache(settings.API_JWT_DECODE_CACHE_SIZE)
+    return _decode_cache
+
+
+@receiver(setting_changed)
+def _reset_decode_cache(*, setting, **kwargs):
+    global _decode_cache, _jwt_config
+    if setting.startswith('API_JWT_'):
+        _decode_cache = None
+        _jwt_config = None
+
+
+def _decode(token):
+    kid = jwt.get_unverified_header(token).get('kid')
+    key = get_key_ring().get_verifying_key(kid)
+    options = {'verify_exp': get_jwt_config().verify_exp}
     return jwt.decode(
         token,
-        JWT_CONFIG.key,
+        key.verifying_key,
         options=options,
-        algorithms=[JWT_CONFIG.algorithm],
+        algorithms=[key.algorithm],
     )
 
 
+def decode(token: str) -> dict:
+    """receive token and get payload
+    verified payloads are cached until token expires,
+    at most `API_JWT_DECODE_CACHE_TIMEOUT` seconds
+    """
+    cache = get_decode_cache()
+    if get_key_ring().refresh() and cache is not None:
+        cache.clear()
+    if cache is None:
+        return _decode(token)
+    key = hashlib.sha256(ensure_bytes(token)).digest()
+    payload = cache.get(key)
+    if payload is None:
+        payload = _decode(token)
+        timeout = settings.API_JWT_DECODE_CACHE_TIMEOUT
+        if 'exp' in payload:
+            timeout = min(timeout, payload['exp'] - time.time())
+        if timeout > 0:
+            cache.set(key, payload, timeout=timeout)
+    return dict(payload)
+
+
 def get_token_from_request(request):
     """get token string from request
     token may stored in cookie or header `AUTHORIZATION`
     """
-    if JWT_CONFIG.auth_cookie:
-        authorization = request.COOKIES.get(JWT_CONFIG.auth_cookie, b'')
+    auth_cookie = get_jwt_config().auth_cookie
+    if auth_cookie:
+        authorization = request.COOKIES.get(auth_cookie, b'')
     else:
         authorization = request.META.get('HTTP_AUTHORIZATION', b'')
     if hasattr(authorization, 'decode'):
@@ -84,18 +195,104 @@ def get_token_from_request(request):
     return None, 'bad format'
 
 
-def generate_token(user):
-    """generate token for user
+def _make_payload(user, expiration_minutes, claims):
+    payload = {
+        'exp': int(time.time() + 60 * expiration_minutes),
+        'jti': uuid.uuid4().hex,
+        get_jwt_config().user_pk_key: user.pk,
+    }
+    payload.update(claims)
+    return payload
+
+
+def generate_token(user, **claims):
+    """generate access token for user, `claims` are added to the payload
     """
-    delta = timedelta(minutes=JWT_CONFIG.expiration_minutes)
-    expire_at = datetime.utcnow() + delta
-    payload = {'exp': expire_at, JWT_CONFIG.user_pk_key: user.pk}
+    for claim in settings.API_JWT_TOKEN_USER_CLAIMS:
+        claims.setdefault(claim, getattr(user, claim))
+    payload = _make_payload(user,
+                            get_jwt_config().expiration_minutes,
+                            claims)
     return encode(payload)
 
 
-def authenticate(request):
-    """Return the user model instance associated with the given request
-    If no user is retrieved, return an instance of `AnonymousUser`
+def _iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def generate_tokens(users, *, processes=None, chunk_size=500, **claims):
+    """generate access tokens for many users, yield `(user, token)` in order
+
+    The signing key and header are prepared once. With `processes`, tokens
+    are signed in a pool of that many processes, which only pays off for
+    asymmetric algorithms.
+    """
+    if isinstance(users, QuerySet):
+        users = users.iterator(chunk_size=chunk_size)
+    key = get_key_ring().get_signing_key()
+    headers = {'kid': key.kid} if key.kid is not None else None
+    expiration_minutes = get_jwt_config().expiration_minutes
+    token_user_claims = settings.API_JWT_TOKEN_USER_CLAIMS
+
+    def make_payload(user):
+        user_claims = {
+            claim: getattr(user, claim)
+            for claim in token_user_claims
+        }
+        user_claims.update(claims)
+        return _make_payload(user, expiration_minutes, user_claims)
+
+    if not processes:
+        signer = jws.Signer(key.algorithm, key.signing_key, headers)
+        for user in users:
+            yield user, signer.sign(make_payload(user))
+        return
+    initargs = (key.algorithm, jws.dump_key(key.signing_key), headers)
+    with ProcessPoolExecutor(processes,
+                             initializer=jws.init_worker,
+                             initargs=initargs) as executor:
+        # bound the chunks in flight so results stream back
+        pending = deque()
+        for chunk in _iter_chunks(users, chunk_size):
+            payloads = [make_payload(user) for user in chunk]
+            pending.append((chunk, executor.submit(jws.sign_many, payloads)))
+            if len(pending) > 2 * processes:
+                chunk, future = pending.popleft()
+                yield from zip(chunk, future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield from zip(chunk, future.result())
+
+
+def generate_refresh_token(user, family=None):
+    """generate refresh token for user, tokens rotated from the same
+    refresh token share a `family`
+    """
+    claims = {'type': REFRESH_TOKEN_TYPE, 'fam': family or uuid.uuid4().hex}
+    payload = _make_payload(user,
+                            settings.API_JWT_REFRESH_EXPIRATION_MINUTES,
+                            claims)
+    return encode(payload)
+
+
+def get_token_user(payload):
+    """Build a `TokenUser` from the claims in `API_JWT_TOKEN_USER_CLAIMS`
+    """
+    claims = {
+        claim: payload[claim]
+        for claim in settings.API_JWT_TOKEN_USER_CLAIMS if claim in payload
+    }
+    return TokenUser(payload[get_jwt_config().user_pk_key], claims)
+
+
+def check_token(request):
+    """Extract and verify the token of request, return `jwt_info`
+    `jwt_info['payload']` is only set if the token is valid
     """
     token, _ = get_token_from_request(request)
     jwt_info = {
@@ -105,11 +302,16 @@ def authenticate(request):
     }
     if not token:
         jwt_info['case'] = TokenCase.NO_TOKEN
-        return get_user(), jwt_info
+        return jwt_info
     try:
         payload = decode(token)
-        user_pk = payload[JWT_CONFIG.user_pk_key]
-        return get_user(user_pk=user_pk), jwt_info
+        if payload.get('type') == REFRESH_TOKEN_TYPE:
+            raise jwt.InvalidTokenError('refresh token is not an access token')
+        payload[get_jwt_config().user_pk_key]
+        if settings.API_JWT_REVOCATION and is_revoked(payload):
+            jwt_info['case'] = TokenCase.REVOKED
+            return jwt_info
+        jwt_info['payload'] = payload
     except jwt.ExpiredSignatureError:
         jwt_info['case'] = TokenCase.EXPIRED
     except jwt.DecodeError:
@@ -118,4 +320,32 @@ def authenticate(request):
         jwt_info['case'] = TokenCase.INVALID_TOKEN
     except KeyError:
         jwt_info['case'] = TokenCase.MISSING_KEY
-    return get_user(), jwt_info
+    return jwt_info
+
+
+def resolve_user(payload=None):
+    """Return the user of a verified payload
+    If there is no payload, return an instance of `AnonymousUser`
+    With `API_JWT_TOKEN_USER` a `TokenUser` is returned instead of the model
+    """
+    if payload is None:
+        return get_user()
+    if settings.API_JWT_TOKEN_USER:
+        return get_token_user(payload)
+    return get_user(user_pk=payload[get_jwt_config().user_pk_key])
+
+
+async def aresolve_user(payload=None):
+    """Async counterpart of `resolve_user`
+    """
+    if payload is None or settings.API_JWT_TOKEN_USER:
+        return resolve_user(payload)
+    return await aget_user(user_pk=payload[get_jwt_config().user_pk_key])
+
+
+def authenticate(request):
+    """Return the user associated with the given request and `jwt_info`
+    If no user is retrieved, return an instance of `AnonymousUser`
+    """
+    jwt_info = check_token(request)
+    return resolve_user(jwt_info['payload']), jwt_info
@@ -1,5 +1,7 @@
 import enum
 
+REFRESH_TOKEN_TYPE = 'refresh'
+
 
 class TokenCase(enum.Enum):
     OK = enum.auto()
@@ -8,3 +10,5 @@ class TokenCase(enum.Enum):
     DECODE_ERROR = enum.auto()
     INVALID_TOKEN = enum.auto()
     MISSING_KEY = enum.auto()
+    REVOKED = enum.auto()
+    REUSED = enum.auto()
@@ -0,0 +1,183 @@
+"""Key ring used to sign and verify tokens
+
+Keys are parsed once and indexed by `kid`:
+
+- `API_JWT_SECRET_KEY` with `API_JWT_ALGORITHM`, kid `None`;
+- `API_JWT_KEYS`, `{kid: {'key': ..., 'public_key': ..., 'algorithm': ...}}`;
+- the JWKS file `API_JWT_JWKS_FILE`, reloaded when it is modified.
+
+New tokens are signed with `API_JWT_SIGNING_KID`, tokens are verified
+with the key named by the `kid` of their header.
+"""
+from dataclasses import dataclass
+import json
+import logging
+import os
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+import jwt
+from jwt.algorithms import get_default_algorithms
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownKeyError(jwt.InvalidTokenError):
+    pass
+
+
+@dataclass(frozen=True)
+class Key:
+    kid: str
+    algorithm: str
+    signing_key: object
+    verifying_key: object
+
+
+def _split_key(key):
+    """(signing key, verifying key) of a parsed key,
+    public keys can not sign
+    """
+    if isinstance(key, bytes):
+        return key, key
+    if hasattr(key, 'public_key'):
+        return key, key.public_key()
+    return None, key
+
+
+def load_key(kid, algorithm, key=None, public_key=None):
+    """Parse a secret or PEM encoded key
+    """
+    try:
+        alg = get_default_algorithms()[algorithm]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'JWT algorithm {algorithm} is not available') from None
+    signing_key = verifying_key = None
+    if key is not None:
+        signing_key, verifying_key = _split_key(alg.prepare_key(key))
+    if public_key is not None:
+        verifying_key = alg.prepare_key(public_key)
+    return Key(kid, algorithm, signing_key, verifying_key)
+
+
+def load_jwk(jwk):
+    """Parse a JSON Web Key
+    """
+    parsed = jwt.PyJWK(jwk)
+    signing_key, verifying_key = _split_key(parsed.key)
+    return Key(jwk.get('kid'), parsed.algorithm_name, signing_key,
+               verifying_key)
+
+
+class KeyRing:
+    def __init__(self,
+                 keys,
+                 signing_kid=None,
+                 jwks_file=None,
+                 reload_interval=60):
+        self.signing_kid = signing_kid
+        self.jwks_file = jwks_file
+        self.reload_interval = reload_interval
+        self._static_keys = keys
+        self._keys = keys
+        self._mtime = None
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+        if jwks_file:
+            self._load_jwks()
+
+    def _load_jwks(self):
+        mtime = os.stat(self.jwks_file).st_mtime_ns
+        with open(self.jwks_file, 'rb') as fp:
+            jwks = json.load(fp)
+        keys = dict(self._static_keys)
+        for jwk in jwks['keys']:
+            key = load_jwk(jwk)
+            keys[key.kid] = key
+        self._keys = keys
+        self._mtime = mtime
+
+    def refresh(self):
+        """Reload the JWKS file if it was modified,
+        checked at most every `reload_interval` seconds.
+        Return True if keys changed
+        """
+        if not self.jwks_file:
+            return False
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return False
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return False
+            self._checked_at = now
+            try:
+                if os.stat(self.jwks_file).st_mtime_ns == self._mtime:
+                    return False
+                self._load_jwks()
+            except (OSError, ValueError, KeyError, jwt.PyJWKError):
+                logger.warning('failed to reload JWKS file %s, '
+                               'keeping current keys',
+                               self.jwks_file,
+                               exc_info=True)
+                return False
+        return True
+
+    def get_signing_key(self):
+        key = self._keys.get(self.signing_kid)
+        if key is None or key.signing_key is None:
+            raise ImproperlyConfigured(
+                f'no signing key for kid {self.signing_kid!r}')
+        return key
+
+    def get_verifying_key(self, kid=None):
+        """Key named by `kid`, tokens without kid fall back to
+        the signing key
+        """
+        key = self._keys.get(kid)
+        if key is None and kid is None:
+            key = self._keys.get(self.signing_kid)
+        if key is None or key.verifying_key is None:
+            raise UnknownKeyError(f'unknown kid {kid!r}')
+        return key
+
+    def __contains__(self, kid):
+        return kid in self._keys
+
+
+def load_key_ring():
+    keys = {}
+    if settings.API_JWT_SECRET_KEY is not None:
+        keys[None] = load_key(None, settings.API_JWT_ALGORITHM,
+                              settings.API_JWT_SECRET_KEY)
+    for kid, options in (settings.API_JWT_KEYS or {}).items():
+        options = dict(options)
+        algorithm = options.pop('algorithm', settings.API_JWT_ALGORITHM)
+        keys[kid] = load_key(kid, algorithm, **options)
+    return KeyRing(keys,
+                   signing_kid=settings.API_JWT_SIGNING_KID,
+                   jwks_file=settings.API_JWT_JWKS_FILE,
+                   reload_interval=settings.API_JWT_JWKS_RELOAD_INTERVAL)
+
+
+_key_ring = None
+
+
+def get_key_ring():
+    global _key_ring
+    if _key_ring is None:
+        _key_ring = load_key_ring()
+    return _key_ring
+
+
+@receiver(setting_changed)
+def _reset_key_ring(*, setting, **kwargs):
+    global _key_ring
+    if setting.startswith('API_JWT_'):
+        _key_ring = None
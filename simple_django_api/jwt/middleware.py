@@ -1,33 +1,89 @@
+import asyncio
+from functools import partial
+
+from asgiref.sync import sync_to_async
 from django.utils.functional import SimpleLazyObject
+
 from . import auth
+from .settings import settings
+from ..compat import markcoroutinefunction
+
+
+def _set_user(request, user):
+    request._jwt_user = request._cached_user = user
 
 
 def authenticate(request):
     user, jwt_info = auth.authenticate(request)
-    request._cached_user = user
     request._jwt_info = jwt_info
-
-
-def get_user(request):
-    # other middleware may already set request._user
-    if not hasattr(request, '_jwt_info'):
-        authenticate(request)
-    return request._cached_user
+    _set_user(request, user)
 
 
 def get_jwt_info(request):
     if not hasattr(request, '_jwt_info'):
-        authenticate(request)
+        request._jwt_info = auth.check_token(request)
     return request._jwt_info
 
 
+def _check_token_may_block():
+    # revocation store query, JWKS file reload
+    return bool(settings.API_JWT_REVOCATION or settings.API_JWT_JWKS_FILE)
+
+
+def get_user(request):
+    # reuse user resolved by `authenticate` or `request.auser()`
+    if not hasattr(request, '_jwt_user'):
+        _set_user(request, auth.resolve_user(get_jwt_info(request)['payload']))
+    return request._jwt_user
+
+
+async def aget_user(request):
+    """Async counterpart of `get_user`, exposed as `request.auser()`
+    """
+    if not hasattr(request, '_jwt_user'):
+        if hasattr(request, '_jwt_info'):
+            jwt_info = request._jwt_info
+        else:
+            jwt_info = await sync_to_async(get_jwt_info)(request)
+        _set_user(request, await auth.aresolve_user(jwt_info['payload']))
+    return request._jwt_user
+
+
 class AuthenticationMiddleware:
+    """Set lazy `request.user` and `request.jwt_info`, and `request.auser()`
+    to resolve the user from async code
+
+    In an async middleware chain the token is checked inline, or in a
+    thread if it may block (`API_JWT_REVOCATION`, `API_JWT_JWKS_FILE`).
+    The user is only loaded on access: async code must use
+    `await request.auser()`, `request.user` is a sync lazy object that
+    would query the database on the event loop, unless `auser()` already
+    resolved it.
+    """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
         if not hasattr(request, 'jwt_info'):
             request.user = SimpleLazyObject(lambda: get_user(request))
             request.jwt_info = SimpleLazyObject(lambda: get_jwt_info(request))
+            request.auser = partial(aget_user, request)
         response = self.get_response(request)
         return response
+
+    async def __acall__(self, request):
+        if not hasattr(request, 'jwt_info'):
+            if _check_token_may_block():
+                request.jwt_info = await sync_to_async(get_jwt_info)(request)
+            else:
+                request.jwt_info = get_jwt_info(request)
+            request.user = SimpleLazyObject(lambda: get_user(request))
+            request.auser = partial(aget_user, request)
+        return await self.get_response(request)
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id',
+                 models.AutoField(auto_created=True,
+                                  primary_key=True,
+                                  serialize=False,
+                                  verbose_name='ID')),
+                ('jti', models.CharField(max_length=255, unique=True)),
+                ('exp', models.BigIntegerField(db_index=True, null=True)),
+                ('revoked_at',
+                 models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,12 @@
+from django.db import models
+
+
+class RevokedToken(models.Model):
+    jti = models.CharField(max_length=255, unique=True)
+    # expiration of the token as a timestamp, `None` if it never expires
+    exp = models.BigIntegerField(null=True, db_index=True)
+    # indexed for the delta queries of `RevocationList.refresh`
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,44 @@
+"""Rotation of refresh tokens
+
+A refresh token is exchanged once for a new access token and a new refresh
+token of the same family. Presenting a used refresh token again revokes the
+whole family, access tokens included when `API_JWT_REVOCATION` is enabled.
+Used tokens are kept in the revocation store.
+"""
+import time
+
+import jwt
+
+from .auth import (decode, generate_refresh_token, generate_token,
+                   get_jwt_config, get_user)
+from .consts import REFRESH_TOKEN_TYPE
+from .revocation import get_revocation_list
+from .settings import settings
+
+
+class RefreshTokenReused(jwt.InvalidTokenError):
+    pass
+
+
+def rotate_refresh_token(token):
+    """Exchange a refresh token for `(access token, refresh token)`
+    """
+    payload = decode(token)
+    if payload.get('type') != REFRESH_TOKEN_TYPE:
+        raise jwt.InvalidTokenError('not a refresh token')
+    family = payload['fam']
+    revocation_list = get_revocation_list()
+    # read the store directly, a stale Bloom filter must not let reuse pass
+    if revocation_list.store.is_revoked(family):
+        raise RefreshTokenReused('refresh token family is revoked')
+    if not revocation_list.revoke(payload['jti'], payload['exp']):
+        # tokens of the family expire before any token issued from now on
+        family_exp = int(time.time() +
+                         60 * settings.API_JWT_REFRESH_EXPIRATION_MINUTES)
+        revocation_list.revoke(family, family_exp)
+        raise RefreshTokenReused('refresh token is already used')
+    user = get_user(payload[get_jwt_config().user_pk_key])
+    if not user.is_authenticated or not user.is_active:
+        raise jwt.InvalidTokenError('user is not active')
+    return (generate_token(user, fam=family),
+            generate_refresh_token(user, family))
@@ -0,0 +1,183 @@
+"""Revocation of tokens before they expire
+
+Revoked `jti` are stored in `API_JWT_REVOCATION_STORE`. Each process keeps
+a Bloom filter of them, the store is only queried when the filter matches.
+Every `API_JWT_REVOCATION_REFRESH_INTERVAL` seconds tokens revoked since
+the previous refresh are added to the filter, a token revoked by another
+process is rejected from then on. The filter is only rebuilt from the whole
+store on first use and once full.
+"""
+from datetime import timedelta
+import threading
+import time
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .settings import settings
+from ..utils.bloom import BloomFilter
+
+
+class BaseRevocationStore:
+    def revoke(self, jti, exp=None):
+        """Return False if `jti` was already revoked
+        """
+        raise NotImplementedError()
+
+    def is_revoked(self, jti):
+        raise NotImplementedError()
+
+    def iter_revoked(self):
+        """`jti` of revoked tokens which are not expired
+        """
+        raise NotImplementedError()
+
+    def iter_revoked_since(self, since):
+        """`jti` of tokens revoked at or after datetime `since`,
+        may include older ones
+        """
+        return self.iter_revoked()
+
+
+class DatabaseRevocationStore(BaseRevocationStore):
+    """Store revoked tokens in the `RevokedToken` model,
+    needs `simple_django_api.jwt` in `INSTALLED_APPS`
+    """
+    def revoke(self, jti, exp=None):
+        from .models import RevokedToken
+        _, created = RevokedToken.objects.get_or_create(
+            jti=jti, defaults={'exp': exp})
+        return created
+
+    def is_revoked(self, jti):
+        from .models import RevokedToken
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def iter_revoked(self):
+        from .models import RevokedToken
+        queryset = RevokedToken.objects.filter(
+            Q(exp__isnull=True) | Q(exp__gt=time.time()))
+        return queryset.values_list('jti', flat=True).iterator()
+
+    def iter_revoked_since(self, since):
+        from .models import RevokedToken
+        queryset = RevokedToken.objects.filter(revoked_at__gte=since)
+        return queryset.values_list('jti', flat=True).iterator()
+
+    def purge(self):
+        """Delete expired tokens
+        """
+        from .models import RevokedToken
+        RevokedToken.objects.filter(exp__lte=time.time()).delete()
+
+
+class RevocationList:
+    #: overlap of delta queries, covers revocations committed late
+    #: and clock skew between processes
+    delta_margin = timedelta(seconds=5)
+
+    def __init__(self, store, refresh_interval=30, error_rate=0.001):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self.error_rate = error_rate
+        self._bloom = None
+        self._capacity = self._count = 0
+        self._built_at = None
+        self._since = None
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """Add tokens revoked since the previous refresh if the filter is
+        stale, other threads keep using the current filter meanwhile
+        """
+        built_at = self._built_at
+        now = time.monotonic()
+        if (not force and built_at is not None
+                and now - built_at < self.refresh_interval):
+            return
+        # without a filter every thread has to wait for one
+        if not self._lock.acquire(blocking=self._bloom is None or force):
+            return
+        try:
+            if not force and built_at is not self._built_at:
+                return
+            started = timezone.now()
+            if self._bloom is None:
+                self._rebuild()
+            else:
+                added = list(
+                    self.store.iter_revoked_since(self._since -
+                                                  self.delta_margin))
+                if self._count + len(added) > self._capacity:
+                    self._rebuild()
+                else:
+                    self._add(added)
+            self._since = started
+            self._built_at = now
+        finally:
+            self._lock.release()
+
+    def _rebuild(self):
+        revoked = list(self.store.iter_revoked())
+        # room for tokens revoked until the filter is full
+        self._capacity = 2 * len(revoked) + 1024
+        self._bloom = BloomFilter(self._capacity, self.error_rate)
+        self._count = 0
+        self._add(revoked)
+
+    def _add(self, revoked):
+        for jti in revoked:
+            self._bloom.add(jti)
+        # overlapping deltas count some tokens twice, rebuilds a bit early
+        self._count += len(revoked)
+
+    def revoke(self, jti, exp=None):
+        created = self.store.revoke(jti, exp)
+        self.refresh()
+        self._add([jti])
+        return created
+
+    def is_revoked(self, jti):
+        self.refresh()
+        return jti in self._bloom and self.store.is_revoked(jti)
+
+
+_revocation_list = None
+
+
+def get_revocation_list():
+    global _revocation_list
+    if _revocation_list is None:
+        store = import_string(settings.API_JWT_REVOCATION_STORE)()
+        _revocation_list = RevocationList(
+            store,
+            refresh_interval=settings.API_JWT_REVOCATION_REFRESH_INTERVAL,
+            error_rate=settings.API_JWT_REVOCATION_ERROR_RATE)
+    return _revocation_list
+
+
+@receiver(setting_changed)
+def _reset_revocation_list(*, setting, **kwargs):
+    global _revocation_list
+    if setting.startswith('API_JWT_REVOCATION'):
+        _revocation_list = None
+
+
+def revoke(payload):
+    """Revoke the token of a decoded payload
+    """
+    if 'jti' not in payload:
+        raise ValueError('token without jti can not be revoked')
+    get_revocation_list().revoke(payload['jti'], payload.get('exp'))
+
+
+def is_revoked(payload):
+    """Whether the token or its refresh token family is revoked
+    """
+    revocation_list = get_revocation_list()
+    return any(
+        revocation_list.is_revoked(payload[claim]) for claim in ('jti', 'fam')
+        if claim in payload)
@@ -1,8 +1,30 @@
 from simple_django_api.utils.settings import FallbackSettings
 
 settings = FallbackSettings(
+    API_JWT_SECRET_KEY=None,
     API_JWT_ALGORITHM='HS256',
+    API_JWT_KEYS=None,
+    API_JWT_SIGNING_KID=None,
+    API_JWT_JWKS_FILE=None,
+    API_JWT_JWKS_RELOAD_INTERVAL=60,
     API_JWT_AUTH_COOKIE='',
     API_JWT_VERIFY_EXPIRATION=True,
     API_JWT_EXPIRATION_MINUTES=10,
+    API_JWT_REFRESH_EXPIRATION_MINUTES=60 * 24 * 7,
+    API_JWT_DECODE_CACHE_SIZE=1024,
+    API_JWT_DECODE_CACHE_TIMEOUT=300,
+    API_JWT_USER_CACHE_BACKEND=None,
+    API_JWT_USER_CACHE_ALIAS='default',
+    API_JWT_USER_CACHE_SIZE=1024,
+    # entries survive QuerySet.update(), see user_cache.invalidate_user
+    API_JWT_USER_CACHE_TIMEOUT=60,
+    API_JWT_USER_ONLY=None,
+    API_JWT_USER_SELECT_RELATED=None,
+    API_JWT_TOKEN_USER=False,
+    API_JWT_TOKEN_USER_CLAIMS=(),
+    API_JWT_REVOCATION=False,
+    API_JWT_REVOCATION_STORE=(
+        'simple_django_api.jwt.revocation.DatabaseRevocationStore'),
+    API_JWT_REVOCATION_REFRESH_INTERVAL=30,
+    API_JWT_REVOCATION_ERROR_RATE=0.001,
 )
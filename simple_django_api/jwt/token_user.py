@@ -0,0 +1,104 @@
+from types import MappingProxyType
+
+
+class TokenUser:
+    """Immutable user built from token claims, without database access
+
+    Claims listed in `API_JWT_TOKEN_USER_CLAIMS` are exposed as attributes.
+    The model instance is only queried when `get_user()` is called,
+    permission checks and `groups` go through it.
+    """
+    __slots__ = ('pk', 'claims', '_user')
+
+    is_active = True
+    is_anonymous = False
+    is_authenticated = True
+
+    def __init__(self, pk, claims=None):
+        object.__setattr__(self, 'pk', pk)
+        claims = MappingProxyType(dict(claims or {}))
+        object.__setattr__(self, 'claims', claims)
+        object.__setattr__(self, '_user', None)
+
+    @property
+    def id(self):
+        return self.pk
+
+    @property
+    def is_staff(self):
+        return bool(self.claims.get('is_staff', False))
+
+    @property
+    def is_superuser(self):
+        return bool(self.claims.get('is_superuser', False))
+
+    def get_username(self):
+        return self.claims.get('username', '')
+
+    def get_user(self):
+        """Load the user model instance, `AnonymousUser` if it is gone
+        """
+        if self._user is None:
+            from .auth import get_user
+            object.__setattr__(self, '_user', get_user(user_pk=self.pk))
+        return self._user
+
+    @property
+    def groups(self):
+        return self.get_user().groups
+
+    @property
+    def user_permissions(self):
+        return self.get_user().user_permissions
+
+    def get_user_permissions(self, obj=None):
+        return self.get_user().get_user_permissions(obj)
+
+    def get_group_permissions(self, obj=None):
+        return self.get_user().get_group_permissions(obj)
+
+    def get_all_permissions(self, obj=None):
+        return self.get_user().get_all_permissions(obj)
+
+    def has_perm(self, perm, obj=None):
+        return self.get_user().has_perm(perm, obj)
+
+    def has_perms(self, perm_list, obj=None):
+        return self.get_user().has_perms(perm_list, obj)
+
+    def has_module_perms(self, module):
+        return self.get_user().has_module_perms(module)
+
+    def __getattr__(self, name):
+        if name == 'claims':
+            # slot not set yet, e.g. while unpickling
+            raise AttributeError(name)
+        try:
+            return self.claims[name]
+        except KeyError:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            ) from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"'{type(self).__name__}' object is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"'{type(self).__name__}' object is immutable")
+
+    def __reduce__(self):
+        return type(self), (self.pk, dict(self.claims))
+
+    def __eq__(self, other):
+        if isinstance(other, TokenUser):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return str(self.get_username() or self.pk)
+
+    def __repr__(self):
+        return f'<{type(self).__name__}: {self.pk}>'
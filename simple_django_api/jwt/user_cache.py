@@ -0,0 +1,168 @@
+"""Cache of users resolved from tokens
+
+Set `API_JWT_USER_CACHE_BACKEND` to `local` (in-process LRU),
+`django` (Django cache `API_JWT_USER_CACHE_ALIAS`) or the dotted path
+of a `BaseUserCache` subclass. Entries are invalidated on `post_save`
+and `post_delete` of the user model, other processes using a `local`
+cache only see changes after `API_JWT_USER_CACHE_TIMEOUT` seconds.
+`QuerySet.update()` and raw SQL send no signal, call `invalidate_user`
+after them.
+"""
+import copy
+
+from asgiref.sync import sync_to_async
+from django.conf import settings as django_settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .settings import settings
+from ..utils.cache import LRUCache
+
+
+class BaseUserCache:
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    def get(self, user_pk):
+        raise NotImplementedError()
+
+    def set(self, user_pk, user):
+        raise NotImplementedError()
+
+    def delete(self, user_pk):
+        raise NotImplementedError()
+
+    async def aget(self, user_pk):
+        return await sync_to_async(self.get)(user_pk)
+
+    async def aset(self, user_pk, user):
+        await sync_to_async(self.set)(user_pk, user)
+
+
+def _snapshot(instance):
+    """Field values of a model instance and of its `select_related`
+    instances, prefetched objects are dropped
+    """
+    names = tuple(field.attname
+                  for field in instance._meta.concrete_fields
+                  if field.attname in instance.__dict__)
+    related = {
+        name: None if obj is None else _snapshot(obj)
+        for name, obj in instance._state.fields_cache.items()
+    }
+    values = tuple(getattr(instance, name) for name in names)
+    return type(instance), instance._state.db, names, values, related
+
+
+def _restore(snapshot):
+    model, db, names, values, related = snapshot
+    # mutable values, e.g. of a JSONField, are not shared
+    values = [
+        copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+        for value in values
+    ]
+    instance = model.from_db(db, names, values)
+    for name, obj in related.items():
+        instance._state.fields_cache[name] = (None if obj is None else
+                                              _restore(obj))
+    return instance
+
+
+class LocalUserCache(BaseUserCache):
+    def __init__(self, timeout):
+        super().__init__(timeout)
+        self._cache = LRUCache(settings.API_JWT_USER_CACHE_SIZE)
+
+    def get(self, user_pk):
+        snapshot = self._cache.get(user_pk)
+        # each request gets its own instance, nothing shared
+        return _restore(snapshot) if snapshot is not None else None
+
+    def set(self, user_pk, user):
+        self._cache.set(user_pk, _snapshot(user), timeout=self.timeout)
+
+    def delete(self, user_pk):
+        self._cache.delete(user_pk)
+
+    # in memory, safe to call on the event loop
+    async def aget(self, user_pk):
+        return self.get(user_pk)
+
+    async def aset(self, user_pk, user):
+        self.set(user_pk, user)
+
+
+class DjangoUserCache(BaseUserCache):
+    key_prefix = 'simple_django_api:jwt:user:'
+
+    def __init__(self, timeout):
+        super().__init__(timeout)
+        self._cache = caches[settings.API_JWT_USER_CACHE_ALIAS]
+
+    def get(self, user_pk):
+        return self._cache.get(f'{self.key_prefix}{user_pk}')
+
+    def set(self, user_pk, user):
+        self._cache.set(f'{self.key_prefix}{user_pk}',
+                        user,
+                        timeout=self.timeout)
+
+    def delete(self, user_pk):
+        self._cache.delete(f'{self.key_prefix}{user_pk}')
+
+    async def aget(self, user_pk):
+        if hasattr(self._cache, 'aget'):  # Django >= 4.0
+            return await self._cache.aget(f'{self.key_prefix}{user_pk}')
+        return await super().aget(user_pk)
+
+    async def aset(self, user_pk, user):
+        if hasattr(self._cache, 'aset'):  # Django >= 4.0
+            await self._cache.aset(f'{self.key_prefix}{user_pk}',
+                                   user,
+                                   timeout=self.timeout)
+        else:
+            await super().aset(user_pk, user)
+
+
+BACKENDS = {
+    'local': LocalUserCache,
+    'django': DjangoUserCache,
+}
+
+_user_cache = None
+
+
+def get_user_cache():
+    """User cache from settings, `None` if disabled
+    """
+    global _user_cache
+    backend = settings.API_JWT_USER_CACHE_BACKEND
+    if _user_cache is None and backend:
+        backend_cls = BACKENDS.get(backend) or import_string(backend)
+        _user_cache = backend_cls(settings.API_JWT_USER_CACHE_TIMEOUT)
+    return _user_cache
+
+
+@receiver(setting_changed)
+def _reset_user_cache(*, setting, **kwargs):
+    global _user_cache
+    if setting.startswith('API_JWT_USER_CACHE'):
+        _user_cache = None
+
+
+def invalidate_user(user_pk):
+    """Drop cached user, needed after changes sending no signal
+    like `QuerySet.update()`
+    """
+    user_cache = get_user_cache()
+    if user_cache is not None:
+        user_cache.delete(user_pk)
+
+
+@receiver(post_save, sender=django_settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=django_settings.AUTH_USER_MODEL)
+def _invalidate_user(*, instance, **kwargs):
+    invalidate_user(instance.pk)
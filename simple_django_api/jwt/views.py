@@ -0,0 +1,38 @@
+import jwt
+
+from .consts import TokenCase
+from .refresh import RefreshTokenReused, rotate_refresh_token
+from ..exceptions import ParamsError, Unauthorized
+from ..views import APIView
+
+
+class RefreshTokenView(APIView):
+    """Exchange a refresh token for new tokens
+
+    POST `{"refresh": "<token>"}` responds
+    `{"access": "<token>", "refresh": "<token>"}`
+    """
+    # access token may be expired, ignore `API_DEFAULT_PERMS`
+    method_perms = {'POST': []}
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            raise ParamsError(user_hint='body must be an object')
+        token = request.data.get('refresh')
+        if not token:
+            raise ParamsError(user_hint=TokenCase.NO_TOKEN.name)
+        if not isinstance(token, str):
+            raise ParamsError(user_hint='refresh must be a string')
+        try:
+            access, refresh = rotate_refresh_token(token)
+        except jwt.ExpiredSignatureError:
+            raise Unauthorized(user_hint=TokenCase.EXPIRED.name)
+        except jwt.DecodeError:
+            raise Unauthorized(user_hint=TokenCase.DECODE_ERROR.name)
+        except RefreshTokenReused:
+            raise Unauthorized(user_hint=TokenCase.REUSED.name)
+        except jwt.InvalidTokenError:
+            raise Unauthorized(user_hint=TokenCase.INVALID_TOKEN.name)
+        except KeyError:
+            raise Unauthorized(user_hint=TokenCase.MISSING_KEY.name)
+        return {'access': access, 'refresh': refresh}
@@ -0,0 +1,245 @@
+"""Request body parsers keyed by media type
+
+A parser is called with the raw request and returns `(data, files)`.
+Register your own with `register_parser` or setting `API_REQUEST_PARSERS`,
+a dict of media type to parser (or its dotted path), `None` disables
+a parser.
+
+.. code:: python
+
+    @register_parser('application/yaml')
+    def parse_yaml(request):
+        return yaml.safe_load(request.body), MultiValueDict()
+"""
+import codecs
+from io import BytesIO
+
+from django.core.exceptions import RequestDataTooBig
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http.multipartparser import MultiPartParserError
+from django.http.request import QueryDict, UnreadablePostError
+from django.utils.datastructures import MultiValueDict
+from django.utils.module_loading import import_string
+
+from . import compat, exceptions
+from .settings import settings
+from .utils import json
+
+PARSERS = {}
+
+
+def register_parser(media_type, parser=None):
+    """Register parser for media type, can be used as decorator
+    """
+    if parser is None:
+        return lambda parser: register_parser(media_type, parser)
+    PARSERS[media_type] = parser
+    _reset_parsers()
+    return parser
+
+
+_parsers = None
+
+
+def get_parsers():
+    """Registered parsers merged with setting `API_REQUEST_PARSERS`
+    """
+    global _parsers
+    if _parsers is None:
+        parsers = dict(PARSERS)
+        for media_type, parser in (settings.API_REQUEST_PARSERS
+                                   or {}).items():
+            if isinstance(parser, str):
+                parser = import_string(parser)
+            parsers[media_type] = parser
+        _parsers = {
+            media_type: parser
+            for media_type, parser in parsers.items() if parser is not None
+        }
+    return _parsers
+
+
+def get_parser(media_type):
+    return get_parsers().get(media_type)
+
+
+def _reset_parsers():
+    global _parsers
+    _parsers = None
+
+
+@receiver(setting_changed)
+def _reset_parsers_on_setting_changed(*, setting, **kwargs):
+    if setting == 'API_REQUEST_PARSERS':
+        _reset_parsers()
+
+
+def parse_json_body(input_data, *, encoding=None):
+    encoding = encoding or 'utf8'
+    backend = json.get_backend()
+    try:
+        # backends accept utf8 bytes directly
+        if hasattr(input_data, 'decode') and \
+                codecs.lookup(encoding).name != 'utf-8':
+            input_data = input_data.decode(encoding)
+        return backend.loads(input_data)
+    except (backend.decode_error, ValueError) as exc:
+        raise exceptions.InvalidRequestBody() from exc
+
+
+def check_upload_size(request):
+    """Same check as `HttpRequest.body` on the size of body
+    """
+    max_size = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+    content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if max_size is not None and content_length > max_size:
+        raise RequestDataTooBig(
+            'Request body exceeded settings.DATA_UPLOAD_MAX_MEMORY_SIZE.')
+
+
+def parse_limited_json_body(request, *, chunk_size=64 * 2**10, **limits):
+    """Read JSON body from request stream in chunks and parse it,
+    the body is rejected as soon as it exceeds one of `limits`,
+    see `utils.json.JsonLimitScanner`
+    """
+    encoding = request.encoding or 'utf8'
+    if hasattr(request, '_body') or codecs.lookup(encoding).name != 'utf-8':
+        try:
+            # scanner works on utf8 only
+            stream = BytesIO(request.body.decode(encoding).encode('utf8'))
+        except UnicodeDecodeError as exc:
+            raise exceptions.InvalidRequestBody() from exc
+    else:
+        check_upload_size(request)
+        stream = request
+    scanner = json.JsonLimitScanner(**limits)
+    # `getvalue` shares the buffer, the body is held in memory once
+    buffer = BytesIO()
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            scanner.feed(chunk)
+            buffer.write(chunk)
+    except json.JsonLimitExceeded as exc:
+        raise exceptions.InvalidRequestBody(user_hint=str(exc)) from exc
+    except OSError as exc:
+        raise UnreadablePostError(*exc.args) from exc
+    body = buffer.getvalue()
+    buffer.close()
+    if not hasattr(request, '_body'):
+        request._body = body
+        request._stream = BytesIO(body)
+    return parse_json_body(body)
+
+
+def iter_ndjson(stream, *, encoding=None, max_line_size=None):
+    """Lazily parse newline delimited JSON from stream line by line,
+    lines longer than `max_line_size` bytes are rejected before being
+    read entirely
+    """
+    limit = None if max_line_size is None else max_line_size + 1
+    while True:
+        line = stream.readline(limit)
+        if not line:
+            break
+        line = line.strip()
+        if max_line_size is not None and len(line) > max_line_size:
+            raise exceptions.InvalidRequestBody(
+                user_hint=f'line exceeds {max_line_size} bytes')
+        if line:
+            yield parse_json_body(line, encoding=encoding)
+
+
+class NdjsonStream:
+    """Single pass iterator of NDJSON documents, used as an object
+    (`data.get(...)`, `data[...]`) it raises `ParamsError`
+    """
+    def __init__(self, documents):
+        self._documents = documents
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._documents)
+
+    def _not_an_object(self, *args, **kwargs):
+        raise exceptions.ParamsError(
+            user_hint='body is a stream of documents, not an object')
+
+    get = __getitem__ = keys = values = items = _not_an_object
+
+
+@register_parser('multipart/form-data')
+def parse_multipart(request):
+    if hasattr(request, '_body'):
+        # Use already read data
+        data = BytesIO(request._body)
+    else:
+        data = request
+    try:
+        return request.parse_file_upload(request.META, data)
+    except MultiPartParserError:
+        # An error occurred while parsing POST data. Since when
+        # formatting the error the request handler might access
+        # self.POST, set self._post and self._file to prevent
+        # attempts to parse POST data again.
+        request._mark_post_parse_error()
+        raise
+
+
+@register_parser('application/x-www-form-urlencoded')
+def parse_form(request):
+    return QueryDict(request.body,
+                     encoding=request.encoding), MultiValueDict()
+
+
+@register_parser('application/json')
+def parse_json(request):
+    limits = json.get_limits()
+    if limits:
+        data = parse_limited_json_body(request, **limits)
+    else:
+        data = parse_json_body(request.body, encoding=request.encoding)
+    return data, MultiValueDict()
+
+
+@register_parser('application/x-ndjson')
+def parse_ndjson(request):
+    # single pass iterator, body is never loaded into memory
+    if hasattr(request, '_body'):
+        data = BytesIO(request._body)
+    else:
+        data = request
+    documents = iter_ndjson(
+        data,
+        encoding=request.encoding,
+        max_line_size=settings.DATA_UPLOAD_MAX_MEMORY_SIZE)
+    return NdjsonStream(documents), MultiValueDict()
+
+
+if compat.msgpack is not None:
+
+    @register_parser('application/msgpack')
+    @register_parser('application/x-msgpack')
+    def parse_msgpack(request):
+        try:
+            data = compat.msgpack.unpackb(request.body, raw=False)
+        except (ValueError, TypeError,
+                compat.msgpack.UnpackException) as exc:
+            raise exceptions.InvalidRequestBody() from exc
+        return data, MultiValueDict()
+
+
+if compat.cbor2 is not None:
+
+    @register_parser('application/cbor')
+    def parse_cbor(request):
+        try:
+            data = compat.cbor2.loads(request.body)
+        except (ValueError, TypeError, compat.cbor2.CBORDecodeError) as exc:
+            raise exceptions.InvalidRequestBody() from exc
+        return data, MultiValueDict()
@@ -20,20 +20,56 @@ You can writer permission in two ways:
                 raise exceptions.Unauthorized()
 
         return inner
+
+
+Permissions are instantiated per request with the view instance. Mark a
+permission as stateless (``stateless = True`` in its class body or the
+``stateless`` decorator) to instantiate it only once with the view class,
+it then has ``view_cls`` but no ``view``. The mark is not inherited,
+subclasses reading ``self.view`` stay per request.
 """
 import abc
+import weakref
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
 from . import exceptions
+from .settings import settings
 
 
 class BasePermission(abc.ABC):
-    def __init__(self, view_cls):
-        self.view = self.view_cls = view_cls
+    #: stateless permissions are instantiated once per view class and
+    #: reused across requests, instead of once per request,
+    #: only applies to the class declaring it
+    stateless = False
+
+    def __init__(self, view):
+        if is_stateless(type(self)):
+            self.view_cls = view
+        else:
+            self.view = self.view_cls = view
 
     @abc.abstractmethod
     def __call__(self, request, **kwargs):
         return True
 
 
+def is_stateless(perm):
+    """Stateless mark of `perm`, classes must declare it themselves
+    """
+    if isinstance(perm, type):
+        return vars(perm).get('stateless', False)
+    return getattr(perm, 'stateless', False)
+
+
+def stateless(perm):
+    """Mark permission as stateless so its checker can be cached
+    """
+    perm.stateless = True
+    return perm
+
+
 class LoginRequired(BasePermission):
     def __call__(self, request, **kwargs):
         if not request.user.is_authenticated:
@@ -46,9 +82,66 @@ class SuperUserRequired(BasePermission):
             raise exceptions.Forbidden()
 
 
+@stateless
 def login_required(view_cls):
     def inner(request, **kwargs):
         if not request.user.is_authenticated:
             raise exceptions.Unauthorized()
 
     return inner
+
+
+_tables = weakref.WeakSet()
+
+
+class PermissionTable:
+    """Resolved method -> permission checkers table of a view class
+
+    The table is built lazily on first lookup and reset whenever
+    `API_DEFAULT_PERMS` is changed.
+    Each entry is a tuple of `(perm, checker)`, `checker` is `None`
+    if `perm` is not stateless and has to be instantiated per request.
+    """
+    def __init__(self, view_cls, method_perms=None):
+        self.view_cls = view_cls
+        self.method_perms = method_perms or {}
+        self._table = None
+        self._default = None
+        _tables.add(self)
+
+    def _resolve(self, perm_lst):
+        if not isinstance(perm_lst, (list, tuple)):
+            perm_lst = [perm_lst]
+        entries = []
+        for perm in perm_lst:
+            checker = None
+            if is_stateless(perm):
+                checker = perm(self.view_cls)
+            entries.append((perm, checker))
+        return tuple(entries)
+
+    def build(self):
+        table = {}
+        for method in {key.upper() for key in self.method_perms}:
+            perm_lst = self.method_perms.get(method, None)
+            if perm_lst is None:
+                perm_lst = self.method_perms.get(method.lower(), None)
+            if perm_lst is not None:
+                table[method] = self._resolve(perm_lst)
+        self._default = self._resolve(settings.API_DEFAULT_PERMS)
+        self._table = table
+
+    def clear(self):
+        self._table = self._default = None
+
+    def get(self, method):
+        if self._table is None:
+            self.build()
+        return self._table.get(method.upper(), self._default)
+
+
+@receiver(setting_changed)
+def _reset_permission_tables(*, setting, **kwargs):
+    if setting == 'API_DEFAULT_PERMS':
+        for table in list(_tables):
+            table.clear()
@@ -0,0 +1,162 @@
+"""Response renderers negotiated by `Accept` header
+
+A renderer has a `media_type` and renders data into bytes.
+Register your own with `register_renderer` or setting `API_RENDERERS`,
+a dict of media type to renderer (or its dotted path), `None` disables
+a renderer. JSON is the default when nothing in `Accept` matches, unless
+it is excluded by `q=0`.
+"""
+import functools
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http.request import MediaType
+from django.utils.module_loading import import_string
+
+from . import compat
+from .settings import settings
+from .utils import json
+
+
+class BaseRenderer:
+    media_type = None
+
+    def render(self, data, **options) -> bytes:
+        raise NotImplementedError()
+
+
+class JsonRenderer(BaseRenderer):
+    media_type = 'application/json'
+
+    def render(self, data, *, ensure_ascii=False, **options):
+        return json.dumps(data, ensure_ascii=ensure_ascii)
+
+
+class MsgpackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+
+    def render(self, data, **options):
+        return compat.msgpack.packb(data,
+                                    default=json.default,
+                                    use_bin_type=True)
+
+
+class CborRenderer(BaseRenderer):
+    media_type = 'application/cbor'
+
+    @staticmethod
+    def _default(encoder, value):
+        encoder.encode(json.default(value))
+
+    def render(self, data, **options):
+        return compat.cbor2.dumps(data, default=self._default)
+
+
+RENDERERS = {JsonRenderer.media_type: JsonRenderer()}
+if compat.msgpack is not None:
+    RENDERERS[MsgpackRenderer.media_type] = MsgpackRenderer()
+if compat.cbor2 is not None:
+    RENDERERS[CborRenderer.media_type] = CborRenderer()
+
+DEFAULT_RENDERER = RENDERERS[JsonRenderer.media_type]
+
+
+def register_renderer(renderer, media_type=None):
+    media_type = media_type or renderer.media_type
+    RENDERERS[media_type] = renderer
+    _reset_renderers()
+    return renderer
+
+
+_renderers = None
+
+
+def get_renderers():
+    """Registered renderers merged with setting `API_RENDERERS`
+    """
+    global _renderers
+    if _renderers is None:
+        renderers = dict(RENDERERS)
+        for media_type, renderer in (settings.API_RENDERERS or {}).items():
+            if isinstance(renderer, str):
+                renderer = import_string(renderer)()
+            renderers[media_type] = renderer
+        _renderers = {
+            media_type: renderer
+            for media_type, renderer in renderers.items()
+            if renderer is not None
+        }
+    return _renderers
+
+
+def _quality(media_type):
+    try:
+        return float(media_type.params.get('q', 1))
+    except ValueError:
+        return 1
+
+
+def _match(media_type, accepted_types):
+    """`(quality, position)` of the most specific accepted type
+    matching `media_type`, `None` if none matches
+    """
+    best = None
+    for index, accepted_type in enumerate(accepted_types):
+        if not accepted_type.match(media_type):
+            continue
+        specificity = ((accepted_type.main_type != '*') +
+                       (accepted_type.sub_type != '*'))
+        if best is None or specificity > best[0]:
+            best = (specificity, _quality(accepted_type), index)
+    return best and best[1:]
+
+
+@functools.lru_cache(maxsize=256)
+def negotiate(accept):
+    """Return renderer best matching `Accept` header, JSON if nothing
+    matches, `None` if JSON is excluded too (`q=0`),
+    results are cached per distinct header
+    """
+    renderers = get_renderers()
+    accepted_types = [
+        MediaType(token) for token in accept.split(',') if token.strip()
+    ]
+    best = None
+    for media_type, renderer in renderers.items():
+        match = _match(media_type, accepted_types)
+        if match is None or match[0] <= 0:
+            continue
+        # highest quality, then first in `Accept`
+        key = (-match[0], match[1])
+        if best is None or key < best[0]:
+            best = (key, renderer)
+    if best is not None:
+        return best[1]
+    match = _match(JsonRenderer.media_type, accepted_types)
+    if match is not None and match[0] <= 0:
+        return None
+    return renderers.get(JsonRenderer.media_type, DEFAULT_RENDERER)
+
+
+@functools.lru_cache(maxsize=256)
+def accepts(accept, media_type):
+    """Whether `media_type` may be sent for `Accept` header, like JSON
+    it is only refused when excluded (`q=0`)
+    """
+    accepted_types = [
+        MediaType(token) for token in accept.split(',') if token.strip()
+    ]
+    match = _match(media_type, accepted_types)
+    return match is None or match[0] > 0
+
+
+def _reset_renderers():
+    global _renderers
+    _renderers = None
+    negotiate.cache_clear()
+
+
+@receiver(setting_changed)
+def _reset_renderers_on_setting_changed(*, setting, **kwargs):
+    if setting == 'API_RENDERERS':
+        _reset_renderers()
@@ -1,28 +1,22 @@
 from io import BytesIO
 from types import MethodType
 
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest as OriginASGIRequest
 from django.core.handlers.wsgi import WSGIRequest as OriginWSGIRequest
-from django.http.request import HttpRequest, QueryDict
-from django.http.multipartparser import MultiPartParserError
+from django.http.request import (HttpRequest, QueryDict, RawPostDataException,
+                                 UnreadablePostError)
 from django.utils.datastructures import MultiValueDict
 
-from . import compat, exceptions
-
-
-def parse_json_body(input_data, *, encoding=None):
-    encoding = encoding or 'utf8'
-    try:
-        if hasattr(input_data, 'decode'):
-            input_data = input_data.decode(encoding)
-        return compat.json.loads(input_data)
-    except (compat.json.JSONDecodeError, ValueError) as exc:
-        raise exceptions.InvalidRequestBody() from exc
+from . import parsers
+from .parsers import (iter_ndjson, parse_json_body,  # noqa: F401
+                      parse_limited_json_body)
 
 
 # this code is part of django.http.request.HttpRequest
 def _load_post_and_files(self):
     """Populate self._post and self._files
-    if the content-type is a form type"""
+    if the content-type has a registered parser"""
     if self.method not in ['POST', 'PUT', 'PATCH']:
         self._post, self._files = QueryDict(
             encoding=self._encoding), MultiValueDict()
@@ -31,33 +25,26 @@ def _load_post_and_files(self):
         self._mark_post_parse_error()
         return
 
-    if self.content_type == 'multipart/form-data':
-        if hasattr(self, '_body'):
-            # Use already read data
-            data = BytesIO(self._body)
-        else:
-            data = self
-        try:
-            self._post, self._files = self.parse_file_upload(self.META, data)
-        except MultiPartParserError:
-            # An error occurred while parsing POST data. Since when
-            # formatting the error the request handler might access
-            # self.POST, set self._post and self._file to prevent
-            # attempts to parse POST data again.
-            self._mark_post_parse_error()
-            raise
-    elif self.content_type == 'application/x-www-form-urlencoded':
-        self._post, self._files = QueryDict(
-            self.body, encoding=self._encoding), MultiValueDict()
-    elif self.content_type == 'application/json':
-        self._post = parse_json_body(self.body, encoding=self._encoding)
-        self._files = MultiValueDict()
-    else:
+    parser = parsers.get_parser(self.content_type)
+    if parser is None:
         self._post, self._files = QueryDict(
             encoding=self._encoding), MultiValueDict()
+    else:
+        self._post, self._files = parser(self)
+
+
+def _is_blocking_stream(stream):
+    """In-memory streams can be read on the event loop,
+    anything else (socket, file spooled to disk) may block
+    """
+    if isinstance(stream, BytesIO):
+        return False
+    return getattr(stream, '_rolled', True)
 
 
 class Request:
+    BODY_CHUNK_SIZE = 64 * 2**10
+
     def __init__(self, raw_request=None):
         if raw_request is None:
             raw_request = HttpRequest()
@@ -77,6 +64,53 @@ class Request:
     def files(self):
         return self._raw_request.files
 
+    async def aiter_body(self, chunk_size=None):
+        """Iterate request body in chunks without blocking the event loop
+        """
+        chunk_size = chunk_size or self.BODY_CHUNK_SIZE
+        raw_request = self._raw_request
+        if hasattr(raw_request, '_body'):
+            body = raw_request._body
+            for start in range(0, len(body), chunk_size):
+                yield body[start:start + chunk_size]
+            return
+        blocking = _is_blocking_stream(getattr(raw_request, '_stream', None))
+        read = sync_to_async(raw_request.read, thread_sensitive=False)
+        while True:
+            try:
+                if blocking:
+                    chunk = await read(chunk_size)
+                else:
+                    chunk = raw_request.read(chunk_size)
+            except OSError as exc:
+                raise UnreadablePostError(*exc.args) from exc
+            if not chunk:
+                break
+            yield chunk
+
+    async def abody(self):
+        """Async counterpart of `body`
+        """
+        raw_request = self._raw_request
+        if not hasattr(raw_request, '_body'):
+            if raw_request._read_started:
+                raise RawPostDataException(
+                    "You cannot access body after reading from request's "
+                    "data stream")
+            parsers.check_upload_size(raw_request)
+            chunks = [chunk async for chunk in self.aiter_body()]
+            raw_request._body = b''.join(chunks)
+            raw_request._stream = BytesIO(raw_request._body)
+        return raw_request._body
+
+    async def adata(self):
+        """Async counterpart of `data`, request body is read
+        without blocking the event loop before parsing
+        """
+        if self.method in ['POST', 'PUT', 'PATCH']:
+            await self.abody()
+        return self.data
+
     def __getattr__(self, name):
         return getattr(self._raw_request, name)
 
@@ -104,3 +138,13 @@ class WSGIRequest(Request):
 
     def __repr__(self):
         return repr(self._raw_request)
+
+
+class ASGIRequest(Request):
+    def __init__(self, scope, body_file, raw_request=None):
+        if not raw_request:
+            raw_request = OriginASGIRequest(scope, body_file)
+        super().__init__(raw_request=raw_request)
+
+    def __repr__(self):
+        return repr(self._raw_request)
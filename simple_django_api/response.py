@@ -1,7 +1,41 @@
 from http import HTTPStatus
-from django.http.response import HttpResponse
+import itertools
 
-from . import consts, compat, exceptions
+from django.core.signals import setting_changed
+from django.db.models import QuerySet
+from django.dispatch import receiver
+from django.http.response import HttpResponse, StreamingHttpResponse
+
+from . import consts, exceptions
+from .settings import settings
+from .utils import json
+from .utils.cache import LRUCache
+
+
+#: marker ending a stream interrupted by an error
+STREAM_ERROR = {'detail': 'stream interrupted'}
+
+_error_response_cache = None
+
+
+def get_error_response_cache():
+    """LRU cache of rendered error responses,
+    `None` if `API_ERROR_RESPONSE_CACHE_SIZE` is 0
+    """
+    global _error_response_cache
+    if (_error_response_cache is None
+            and settings.API_ERROR_RESPONSE_CACHE_SIZE):
+        _error_response_cache = LRUCache(
+            settings.API_ERROR_RESPONSE_CACHE_SIZE)
+    return _error_response_cache
+
+
+@receiver(setting_changed)
+def _reset_error_response_cache(*, setting, **kwargs):
+    global _error_response_cache
+    if setting in ('API_ERROR_RESPONSE_CACHE_SIZE', 'API_JSON_BACKEND',
+                   'API_RENDERERS'):
+        _error_response_cache = None
 
 
 class JsonResponse(HttpResponse):
@@ -14,20 +48,33 @@ class JsonResponse(HttpResponse):
                  *,
                  ensure_ascii=False,
                  status_code=HTTPStatus.OK,
+                 renderer=None,
+                 rendered=None,
                  **kwargs):
+        """`renderer` renders data in other format than JSON,
+        see `simple_django_api.renderers`,
+        `rendered` is `(content, content_type)` of data already rendered
+        """
         if isinstance(data, str):
             data = {'detail': data}
         if hasattr(status_code, 'value'):
             status_code = status_code.value
-        kwargs['content_type'] = self.content_type
-        content = compat.json.dumps(data, ensure_ascii=ensure_ascii)
+        if rendered is not None:
+            content, kwargs['content_type'] = rendered
+        elif renderer is None:
+            kwargs['content_type'] = self.content_type
+            content = json.dumps(data, ensure_ascii=ensure_ascii)
+        else:
+            kwargs['content_type'] = renderer.media_type
+            content = renderer.render(data, ensure_ascii=ensure_ascii)
         super().__init__(content=content, status=status_code, **kwargs)
 
     @classmethod
     def from_exception(cls,
                        exc: exceptions.APIError,
                        status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
-                       user_hint=''):
+                       user_hint='',
+                       **kwargs):
         """Generate response from APIError
         """
         if not user_hint:
@@ -35,7 +82,24 @@ class JsonResponse(HttpResponse):
         if not user_hint:
             user_hint = consts.ERROR_MSG.get(status_code, '')
         status_code = getattr(exc, 'status_code', status_code)
-        return cls(user_hint, status_code=status_code)
+        if hasattr(status_code, 'value'):
+            status_code = status_code.value
+        cache = get_error_response_cache()
+        if (cache is None or not isinstance(user_hint, str)
+                or not kwargs.keys() <= {'renderer', 'ensure_ascii'}):
+            return cls(user_hint, status_code=status_code, **kwargs)
+        key = (cls, type(exc), status_code, user_hint,
+               kwargs.get('renderer'), kwargs.get('ensure_ascii', False))
+        rendered = cache.get(key)
+        if rendered is None:
+            response = cls(user_hint, status_code=status_code, **kwargs)
+            cache.set(key, (response.content, response['Content-Type']))
+            return response
+        # skip rendering, content is shared but never mutated
+        return cls(user_hint,
+                   status_code=status_code,
+                   rendered=rendered,
+                   **kwargs)
 
     @classmethod
     def created(cls, data, **kwargs):
@@ -48,4 +112,100 @@ class JsonResponse(HttpResponse):
         return cls(data, **kwargs)
 
 
+class StreamingJsonResponse(StreamingHttpResponse):
+    """Stream iterable as JSON array, items are encoded and sent in chunks
+
+    QuerySet is iterated by `.iterator(chunk_size=...)` so rows are never
+    loaded into memory at once. Set `envelope` to wrap the array into an
+    object like `{"results": [...]}`, `extra` are the other keys
+    of that object.
+
+    The first item is fetched on construction, so errors raised before
+    anything is sent propagate to the caller. Errors raised later are
+    passed to `on_error` and end the stream with `STREAM_ERROR`: as the
+    `"error"` key of the envelope, without an envelope the array is left
+    unclosed so that clients cannot mistake it for a complete result.
+    """
+    content_type = 'application/json'
+    chunk_size = 500
+
+    def __init__(self,
+                 data,
+                 *,
+                 envelope=None,
+                 extra=None,
+                 chunk_size=None,
+                 on_error=None,
+                 status_code=HTTPStatus.OK,
+                 **kwargs):
+        chunk_size = chunk_size or self.chunk_size
+        if isinstance(data, QuerySet):
+            data = data.iterator(chunk_size=chunk_size)
+        if hasattr(status_code, 'value'):
+            status_code = status_code.value
+        kwargs['content_type'] = self.content_type
+        items = self._guard(self._prefetch(data), on_error)
+        content = self._render(items, envelope, extra, chunk_size)
+        super().__init__(content, status=status_code, **kwargs)
+
+    @staticmethod
+    def _prefetch(data):
+        items = iter(data)
+        for item in items:
+            return itertools.chain((item, ), items)
+        return iter(())
+
+    @staticmethod
+    def _guard(items, on_error):
+        try:
+            yield from items
+        except Exception as exc:
+            if on_error is not None:
+                on_error(exc)
+            yield STREAM_ERROR
+
+    @staticmethod
+    def _render(items, envelope, extra, chunk_size):
+        prefix, suffix = b'[', b']'
+        if envelope:
+            head = json.dumps(extra) if extra else b'{}'
+            head = head[:-1] + b', ' if extra else b'{'
+            prefix = head + json.dumps(envelope) + b': ['
+            suffix = b']}'
+        chunk, delimiter = [], b''
+        for item in items:
+            if item is STREAM_ERROR:
+                yield prefix + delimiter + b', '.join(chunk)
+                if envelope:
+                    yield b'], "error": ' + json.dumps(STREAM_ERROR) + b'}'
+                return
+            chunk.append(json.dumps(item))
+            if len(chunk) >= chunk_size:
+                yield prefix + delimiter + b', '.join(chunk)
+                prefix, delimiter, chunk = b'', b', ', []
+        yield prefix + (delimiter if chunk else b'') + b', '.join(chunk)
+        yield suffix
+
+
+class NdjsonResponse(StreamingJsonResponse):
+    """Stream iterable as newline delimited JSON, one document per line,
+    an error ends the stream with a `{"error": ...}` line
+    """
+    content_type = 'application/x-ndjson'
+
+    @staticmethod
+    def _render(items, envelope, extra, chunk_size):
+        chunk = []
+        for item in items:
+            if item is STREAM_ERROR:
+                chunk.append(json.dumps({'error': STREAM_ERROR}))
+                break
+            chunk.append(json.dumps(item))
+            if len(chunk) >= chunk_size:
+                yield b'\n'.join(chunk) + b'\n'
+                chunk = []
+        if chunk:
+            yield b'\n'.join(chunk) + b'\n'
+
+
 APIResponse = JsonResponse
@@ -0,0 +1,18 @@
+from simple_django_api.utils.settings import FallbackSettings
+
+settings = FallbackSettings(
+    API_JSON_BACKEND=None,
+    API_JSON_MAX_DEPTH=None,
+    API_JSON_MAX_STRING_LENGTH=None,
+    API_JSON_MAX_ELEMENTS=None,
+    API_VIEW_EXCEPTION_HANDLER=None,
+    API_DEFAULT_PERMS=(),
+    API_REQUEST_PARSERS=None,
+    API_RENDERERS=None,
+    API_ERROR_RESPONSE_CACHE_SIZE=256,
+    API_LOG_MAX_DATA_SIZE=2048,
+    API_LOG_MAX_QUERY_SIZE=1024,
+    API_LOG_REDACT_FIELDS=('password', 'token', 'secret', 'refresh',
+                           'access'),
+    API_LOG_SAMPLING=None,
+)
@@ -0,0 +1,32 @@
+import hashlib
+import math
+
+from .string import ensure_bytes
+
+
+class BloomFilter:
+    """Probabilistic set, membership tests have false positives
+    at about `error_rate` for `capacity` items but no false negatives
+    """
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.num_bits = max(
+            8, int(-capacity * math.log(error_rate) / math.log(2)**2))
+        self.num_hashes = max(
+            1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item):
+        # double hashing, see Kirsch and Mitzenmacher
+        digest = hashlib.blake2b(ensure_bytes(item), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7))
+                   for pos in self._positions(item))
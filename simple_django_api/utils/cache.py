@@ -0,0 +1,56 @@
+"""In-process caches
+"""
+from collections import OrderedDict
+import threading
+import time
+
+
+class LRUCache:
+    """Thread safe LRU cache with per entry timeout
+
+    `hits` and `misses` count lookups, expired entries count as misses.
+    """
+    def __init__(self, maxsize=128, *, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expire_at = item
+                if expire_at is None or expire_at > self._timer():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, *, timeout=None):
+        """`timeout` in seconds, `None` means never expires
+        """
+        expire_at = None if timeout is None else self._timer() + timeout
+        with self._lock:
+            self._data[key] = (value, expire_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self)}
+
+    def __len__(self):
+        return len(self._data)
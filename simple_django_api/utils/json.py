@@ -0,0 +1,276 @@
+"""Pluggable JSON backends
+
+The backend is chosen by setting `API_JSON_BACKEND`, one of `orjson`,
+`msgspec`, `ujson`, `json` or the dotted path of a backend class.
+By default `ujson` is used if installed, otherwise `json`.
+
+Backends encode to bytes directly and support `datetime`, `Decimal`,
+`UUID` and dataclasses. `Decimal` is encoded as a string, except by
+`ujson` which encodes it as a number.
+"""
+import dataclasses
+import json
+import re
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from ..settings import settings
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def default(obj):
+    """Serialize objects unknown to the backend
+    """
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    return _django_encoder.default(obj)
+
+
+class BaseJsonBackend:
+    decode_error = ValueError
+
+    def dumps(self, data, *, ensure_ascii=False) -> bytes:
+        raise NotImplementedError()
+
+    def loads(self, data):
+        raise NotImplementedError()
+
+
+class StdlibJsonBackend(BaseJsonBackend):
+    name = 'json'
+
+    def dumps(self, data, *, ensure_ascii=False):
+        content = json.dumps(data, ensure_ascii=ensure_ascii, default=default)
+        return content.encode('utf8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class UjsonBackend(BaseJsonBackend):
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def dumps(self, data, *, ensure_ascii=False):
+        content = self._ujson.dumps(data,
+                                    ensure_ascii=ensure_ascii,
+                                    default=default)
+        return content.encode('utf8')
+
+    def loads(self, data):
+        if isinstance(data, bytearray):
+            data = bytes(data)
+        return self._ujson.loads(data)
+
+
+class OrjsonBackend(BaseJsonBackend):
+    """orjson always emits utf8, `ensure_ascii` falls back to stdlib
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self._option = orjson.OPT_NON_STR_KEYS
+        self._ascii_backend = StdlibJsonBackend()
+
+    def dumps(self, data, *, ensure_ascii=False):
+        if ensure_ascii:
+            return self._ascii_backend.dumps(data, ensure_ascii=True)
+        return self._orjson.dumps(data, default=default, option=self._option)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+class MsgspecBackend(BaseJsonBackend):
+    """msgspec always emits utf8, `ensure_ascii` falls back to stdlib
+    """
+    name = 'msgspec'
+
+    def __init__(self):
+        import msgspec
+        self.decode_error = msgspec.DecodeError
+        self._encoder = msgspec.json.Encoder(enc_hook=default)
+        self._decoder = msgspec.json.Decoder()
+        self._ascii_backend = StdlibJsonBackend()
+
+    def dumps(self, data, *, ensure_ascii=False):
+        if ensure_ascii:
+            return self._ascii_backend.dumps(data, ensure_ascii=True)
+        return self._encoder.encode(data)
+
+    def loads(self, data):
+        return self._decoder.decode(data)
+
+
+class JsonLimitExceeded(ValueError):
+    pass
+
+
+class JsonLimitScanner:
+    """Check JSON document against limits while it is fed in chunks
+
+    Only structure is scanned, values are left to the backend. Limits are:
+
+    * `max_depth`: nesting depth of arrays and objects
+    * `max_string_length`: length of a string in bytes, escapes included
+    * `max_elements`: number of array items and object members, a nested
+      array or object is one item of its parent
+
+    Chunks are split on quotes and structural characters are counted,
+    so scanning stays in C for the common case.
+    Input must be utf8 (or any encoding whose multibyte
+    sequences never contain ascii bytes).
+    """
+    _escape = re.compile(rb'\\.', re.S)
+    _brackets = bytes.maketrans(b'{}', b'[]')
+    _non_brackets = bytes(set(range(256)) - set(b'[]{}'))
+    _whitespace = b' \t\r\n'
+
+    def __init__(self,
+                 *,
+                 max_depth=None,
+                 max_string_length=None,
+                 max_elements=None):
+        self.max_depth = max_depth
+        self.max_string_length = max_string_length
+        self.max_elements = max_elements
+        self.depth = 0
+        self.elements = 0
+        self._in_string = False
+        self._string_length = 0
+        self._pending = b''
+        # last token seen opens a container, which may still be empty
+        self._after_open = False
+
+    def feed(self, chunk):
+        buf = self._pending + chunk if self._pending else chunk
+        self._pending = b''
+        if b'\\' in buf:
+            # mask escapes so escaped quotes do not end strings,
+            # a dangling backslash waits for the next chunk
+            buf = self._escape.sub(b'__', buf)
+            if buf.endswith(b'\\'):
+                buf, self._pending = buf[:-1], b'\\'
+        parts = buf.split(b'"')
+        in_string = self._in_string
+        strings = parts[0 if in_string else 1::2]
+        outside = parts[1 if in_string else 0::2]
+        self._in_string = (in_string + len(parts) - 1) % 2 == 1
+        if self.max_string_length is not None and strings:
+            lengths = list(map(len, strings))
+            if in_string:
+                lengths[0] += self._string_length
+            if max(lengths) > self.max_string_length:
+                raise JsonLimitExceeded('string too long')
+            self._string_length = lengths[-1]
+        # strings become a `0` token, so `[""]` is not taken for empty
+        tokens = b'0'.join(outside)
+        if self._in_string:
+            tokens += b'0'
+        self._check_structure(tokens)
+
+    def _count_items(self, outside):
+        # a container holds commas + 1 items unless empty
+        tokens = outside.translate(self._brackets, self._whitespace)
+        if not tokens:
+            return 0
+        items = tokens.count(b',') + tokens.count(b'[') - tokens.count(b'[]')
+        if self._after_open:
+            items += tokens[0] != 0x5d
+        self._after_open = tokens[-1] == 0x5b
+        return items - self._after_open
+
+    def _check_structure(self, outside):
+        opens = outside.count(b'[') + outside.count(b'{')
+        closes = outside.count(b']') + outside.count(b'}')
+        self.elements += self._count_items(outside)
+        if self.max_elements is not None and \
+                self.elements > self.max_elements:
+            raise JsonLimitExceeded('too many elements')
+        if self.max_depth is not None and \
+                self.depth + opens > self.max_depth:
+            self._check_depth(outside)
+        self.depth += opens - closes
+
+    def _check_depth(self, outside):
+        brackets = outside.translate(self._brackets, self._non_brackets)
+        # strip nested pairs level by level, what remains is `]]..[[`
+        level, reduced = 0, brackets
+        while b'[]' in reduced:
+            level += 1
+            if level > self.max_depth:
+                raise JsonLimitExceeded('too deeply nested')
+            reduced = reduced.replace(b'[]', b'')
+        if self.depth + reduced.count(b'[') + level <= self.max_depth:
+            return
+        depth = self.depth
+        for char in brackets:
+            depth += 1 if char == 0x5b else -1
+            if depth > self.max_depth:
+                raise JsonLimitExceeded('too deeply nested')
+
+
+def get_limits():
+    """JSON body limits from settings, empty if none is set
+    """
+    limits = {
+        'max_depth': settings.API_JSON_MAX_DEPTH,
+        'max_string_length': settings.API_JSON_MAX_STRING_LENGTH,
+        'max_elements': settings.API_JSON_MAX_ELEMENTS,
+    }
+    return {key: value for key, value in limits.items() if value is not None}
+
+
+BACKENDS = {
+    backend_cls.name: backend_cls
+    for backend_cls in (StdlibJsonBackend, UjsonBackend, OrjsonBackend,
+                        MsgspecBackend)
+}
+
+
+def load_backend(name=None):
+    """Instantiate backend by name or dotted path
+    """
+    if not name:
+        try:
+            return UjsonBackend()
+        except ImportError:
+            return StdlibJsonBackend()
+    backend_cls = BACKENDS.get(name)
+    if backend_cls is None:
+        backend_cls = import_string(name)
+    return backend_cls()
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = load_backend(settings.API_JSON_BACKEND)
+    return _backend
+
+
+def dumps(data, *, ensure_ascii=False) -> bytes:
+    return get_backend().dumps(data, ensure_ascii=ensure_ascii)
+
+
+def loads(data):
+    return get_backend().loads(data)
+
+
+@receiver(setting_changed)
+def _reset_backend(*, setting, **kwargs):
+    global _backend
+    if setting == 'API_JSON_BACKEND':
+        _backend = None
@@ -0,0 +1,52 @@
+"""Compact JWS signing with the key and header prepared once
+
+Only depends on PyJWT so that process pool workers do not need
+Django settings.
+"""
+import json
+
+from jwt.algorithms import get_default_algorithms
+from jwt.utils import base64url_encode
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+class Signer:
+    def __init__(self, algorithm, key, headers=None):
+        self.algorithm = algorithm
+        self._alg = get_default_algorithms()[algorithm]
+        self._key = self._alg.prepare_key(key)
+        header = {'alg': algorithm, 'typ': 'JWT', **(headers or {})}
+        self._header = base64url_encode(_dumps(header))
+
+    def sign(self, payload):
+        """Token of a payload, claims have to be JSON serializable
+        """
+        signing_input = self._header + b'.' + base64url_encode(_dumps(payload))
+        signature = self._alg.sign(signing_input, self._key)
+        return (signing_input + b'.' + base64url_encode(signature)).decode()
+
+
+def dump_key(key):
+    """Picklable form of a prepared signing key
+    """
+    if isinstance(key, bytes):
+        return key
+    from cryptography.hazmat.primitives import serialization
+    return key.private_bytes(serialization.Encoding.PEM,
+                             serialization.PrivateFormat.PKCS8,
+                             serialization.NoEncryption())
+
+
+_signer = None
+
+
+def init_worker(algorithm, key, headers):
+    global _signer
+    _signer = Signer(algorithm, key, headers)
+
+
+def sign_many(payloads):
+    return [_signer.sign(payload) for payload in payloads]
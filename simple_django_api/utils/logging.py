@@ -1,10 +1,527 @@
+import atexit
 from collections import OrderedDict
+from collections.abc import Mapping
+import copy
+import logging
+from logging.handlers import QueueHandler
+import os
+import queue
+import threading
+import time
+import traceback
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from . import json
+from ..settings import settings
+
+
+class _Lazy:
+    __slots__ = ('func', )
+
+    def __init__(self, func):
+        self.func = func
 
 
 class LoggingContext(OrderedDict):
+    """Key values rendered as `[key: value]`
+
+    Values set with `set_lazy` are only computed when the record
+    is formatted.
+    """
     def __init__(self, delimiter=' '):
         self.delimiter = delimiter
 
+    def set_lazy(self, key, func):
+        self[key] = _Lazy(func)
+
+    def resolve(self):
+        """Compute lazy values in place
+        """
+        for key, value in list(self.items()):
+            if isinstance(value, _Lazy):
+                self[key] = value.func()
+        return self
+
     def __str__(self):
-        parts = [f'[{key}: {value}]' for key, value in self.items()]
+        parts = [f'[{key}: {value}]' for key, value in self.resolve().items()]
         return self.delimiter.join(parts)
+
+
+REDACTED = '********'
+
+
+def redact(value, fields):
+    """Copy of mappings and lists with values of `fields` keys redacted,
+    keys are compared case insensitively
+    """
+    if isinstance(value, Mapping):
+        return {
+            key: REDACTED if str(key).lower() in fields else redact(
+                item, fields)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item, fields) for item in value]
+    return value
+
+
+def truncate(value, max_size):
+    """`str(value)` cut to `max_size` utf8 bytes, `None` for no limit
+    """
+    text = value if isinstance(value, str) else str(value)
+    if max_size is None:
+        return text
+    raw = text.encode('utf8', 'replace')
+    if len(raw) <= max_size:
+        return text
+    text = raw[:max_size].decode('utf8', 'ignore')
+    return f'{text}...({len(raw)} bytes)'
+
+
+def _jsonable(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class NdjsonFormatter(logging.Formatter):
+    """Format a record as one JSON line, keys of a `LoggingContext`
+    message become fields
+    """
+    def format(self, record):
+        data = {
+            'time': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        if isinstance(record.msg, LoggingContext):
+            for key, value in record.msg.resolve().items():
+                data[key] = _jsonable(value)
+        else:
+            data['message'] = record.getMessage()
+        exc = getattr(record, 'traceback_exception', None)
+        if exc is not None:
+            # captured by `QueuedNdjsonHandler.prepare`
+            data['exc_info'] = ''.join(exc.format()).rstrip('\n')
+        elif record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exc_info'] = record.exc_text
+        return json.dumps(data).decode()
+
+
+class NdjsonQueueListener:
+    """Drain a queue of records in a thread and write them as NDJSON
+
+    Records are written in batches of up to `batch_size`, waiting at most
+    `flush_interval` seconds for a batch to fill. `target` is a file path
+    or a binary stream, e.g. `socket.create_connection(addr).makefile('wb')`.
+    `dropped` returns the number of records dropped so far, new drops are
+    written as a line at most every `report_interval` seconds.
+    """
+    _sentinel = None
+
+    def __init__(self,
+                 queue,
+                 target,
+                 *,
+                 batch_size=100,
+                 flush_interval=1.0,
+                 formatter=None,
+                 dropped=None,
+                 report_interval=10.0):
+        self.queue = queue
+        self.target = target
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.formatter = formatter or NdjsonFormatter()
+        self.dropped = dropped
+        self.report_interval = report_interval
+        self.errors = 0
+        self._reported_dropped = 0
+        self._reported_at = None
+        self._stream = None
+        self._thread = None
+
+    def start(self):
+        if isinstance(self.target, (str, os.PathLike)):
+            self._stream = open(self.target, 'ab')
+        else:
+            self._stream = self.target
+        self._thread = threading.Thread(target=self._monitor, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Write pending records and wait for the thread,
+        at most `timeout` seconds for each step
+        """
+        if self._thread is None:
+            return
+        if self._thread.is_alive():
+            try:
+                self.queue.put(self._sentinel, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        self._thread = None
+        if self._stream is not self.target:
+            self._stream.close()
+
+    def _get_batch(self):
+        """(records, stopped), waits at most `flush_interval` for
+        a first record
+        """
+        try:
+            record = self.queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return [], False
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while record is not self._sentinel:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    record = self.queue.get(timeout=timeout)
+                else:
+                    record = self.queue.get_nowait()
+            except queue.Empty:
+                return batch, False
+        return batch, True
+
+    def _report_dropped(self):
+        """Record of records dropped since the last report, `None` if none
+        or reported less than `report_interval` seconds ago
+        """
+        if self.dropped is None:
+            return None
+        now = time.monotonic()
+        if self._reported_at is not None and \
+                now - self._reported_at < self.report_interval:
+            return None
+        dropped = self.dropped()
+        count = dropped - self._reported_dropped
+        if count <= 0:
+            return None
+        self._reported_dropped = dropped
+        self._reported_at = now
+        context = LoggingContext()
+        context['message'] = 'records dropped, queue full'
+        context['dropped'] = count
+        return logging.LogRecord(__name__, logging.WARNING, __file__, 0,
+                                 context, None, None)
+
+    def _monitor(self):
+        stopped = False
+        while not stopped:
+            batch, stopped = self._get_batch()
+            report = self._report_dropped()
+            if report is not None:
+                batch.append(report)
+            lines = []
+            for record in batch:
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception:
+                    self.errors += 1
+            if not lines:
+                continue
+            try:
+                self._stream.write(('\n'.join(lines) + '\n').encode())
+                self._stream.flush()
+            except Exception:
+                self.errors += len(lines)
+
+
+class QueuedNdjsonHandler(QueueHandler):
+    """Hand records to a `NdjsonQueueListener` without blocking
+
+    The queue holds at most `maxsize` records, records are dropped
+    and counted in `dropped` while it is full, the listener writes their
+    count every `report_interval` seconds at most. The listener is started
+    on first emit, and again in a forked process (e.g. gunicorn
+    `--preload` workers) since threads do not survive a fork.
+
+    .. code:: python
+
+        LOGGING['handlers']['ndjson'] = {
+            'class': 'simple_django_api.utils.logging.QueuedNdjsonHandler',
+            'target': '/var/log/api.ndjson',
+        }
+    """
+    def __init__(self,
+                 target,
+                 maxsize=10000,
+                 batch_size=100,
+                 flush_interval=1.0,
+                 report_interval=10.0):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+        self.listener = None
+        self._listener_options = {
+            'target': target,
+            'batch_size': batch_size,
+            'flush_interval': flush_interval,
+            'report_interval': report_interval,
+        }
+        self._pid = None
+
+    def _ensure_listener(self):
+        # called with the handler lock held
+        if self._pid == os.getpid():
+            return
+        if self._pid is not None:
+            # forked, records of the parent are not ours to write
+            self.queue = queue.Queue(self.queue.maxsize)
+            self.dropped = 0
+        self.listener = NdjsonQueueListener(self.queue,
+                                            dropped=lambda: self.dropped,
+                                            **self._listener_options)
+        self.listener.start()
+        self._pid = os.getpid()
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def prepare(self, record):
+        # request objects and traceback frames must not outlive the
+        # request, only strings, numbers and a frameless traceback are
+        # handed to the listener, which formats the traceback
+        record = copy.copy(record)
+        if isinstance(record.msg, LoggingContext):
+            context = LoggingContext(record.msg.delimiter)
+            for key, value in record.msg.resolve().items():
+                context[key] = _jsonable(value)
+            record.msg = context
+        else:
+            record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.traceback_exception = traceback.TracebackException(
+                *record.exc_info, lookup_lines=False)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # called with the handler lock held
+            self.dropped += 1
+
+    def close(self):
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+        super().close()
+
+
+def exception_fingerprint(exc):
+    """Exception class and the location it was raised at
+    """
+    tb = exc.__traceback__
+    location = None
+    if tb is not None:
+        while tb.tb_next is not None:
+            tb = tb.tb_next
+        location = (tb.tb_frame.f_code.co_filename, tb.tb_lineno)
+    cls = type(exc)
+    return f'{cls.__module__}.{cls.__qualname__}', location
+
+
+class LogSampler:
+    """Allow the first `limit` records of a fingerprint in each `window`
+    seconds and count the others, at most `maxsize` fingerprints are tracked
+
+    Counts not reported by `allow` are kept for `pop_suppressed`: those of
+    fingerprints evicted, or whose window ended without a new record.
+    Once a record is suppressed, a daemon thread calls `report_suppressed`
+    every `window` seconds, so counts are logged as summaries at `level`
+    to the logger given to `allow` even if no record follows.
+    """
+    def __init__(self,
+                 limit=10,
+                 window=60,
+                 maxsize=1024,
+                 timer=time.monotonic,
+                 level=logging.ERROR):
+        self.limit = limit
+        self.window = window
+        self.maxsize = maxsize
+        self.timer = timer
+        self.level = level
+        # fingerprint -> [window start, count, suppressed, logger]
+        self._states = OrderedDict()
+        # [(fingerprint, suppressed, logger)]
+        self._pending = []
+        self._swept_at = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._reporter_pid = None
+
+    def allow(self, fingerprint, logger=None):
+        """Return `(allowed, suppressed)`, `suppressed` is the number of
+        records not allowed in the previous window, reported once
+        """
+        now = self.timer()
+        with self._lock:
+            state = self._states.get(fingerprint)
+            if state is None:
+                state = self._states[fingerprint] = [now, 0, 0, logger]
+                if len(self._states) > self.maxsize:
+                    evicted, evicted_state = self._states.popitem(
+                        last=False)
+                    if evicted_state[2]:
+                        self._pending.append((evicted, *evicted_state[2:]))
+            else:
+                self._states.move_to_end(fingerprint)
+            suppressed = 0
+            if now - state[0] >= self.window:
+                suppressed = state[2]
+                state[:3] = [now, 0, 0]
+            if self._swept_at is None:
+                self._swept_at = now
+            elif now - self._swept_at >= self.window:
+                self._sweep(now)
+            state[1] += 1
+            if state[1] > self.limit:
+                state[2] += 1
+                self._ensure_reporter()
+                return False, 0
+            return True, suppressed
+
+    def _sweep(self, now):
+        self._swept_at = now
+        expired = [
+            fingerprint for fingerprint, state in self._states.items()
+            if now - state[0] >= self.window
+        ]
+        for fingerprint in expired:
+            state = self._states.pop(fingerprint)
+            if state[2]:
+                self._pending.append((fingerprint, *state[2:]))
+
+    def _pop(self, flush=False, sweep=False):
+        with self._lock:
+            if sweep:
+                self._sweep(self.timer())
+            if flush:
+                for fingerprint, state in self._states.items():
+                    if state[2]:
+                        self._pending.append((fingerprint, *state[2:]))
+                        state[2] = 0
+            pending, self._pending = self._pending, []
+        return pending
+
+    def pop_suppressed(self):
+        """Return and forget `[(fingerprint, suppressed)]` not reported
+        by `allow`
+        """
+        return [entry[:2] for entry in self._pop()]
+
+    def flush(self):
+        """Return and forget every suppressed count, e.g. at shutdown
+        """
+        return [entry[:2] for entry in self._pop(flush=True)]
+
+    def report_suppressed(self, flush=False, sweep=False):
+        """Log counts not reported by `allow` as summaries,
+        every suppressed count if `flush`, windows are checked if `sweep`
+        """
+        for fingerprint, count, logger in self._pop(flush, sweep):
+            log_suppressed(logger or _logger, self.level, fingerprint, count)
+
+    def _ensure_reporter(self):
+        # called with the lock held, threads do not survive a fork
+        if self._reporter_pid == os.getpid() or self._stopped.is_set():
+            return
+        self._reporter_pid = os.getpid()
+        threading.Thread(target=self._report_periodically,
+                         daemon=True).start()
+
+    def _report_periodically(self):
+        while not self._stopped.wait(self.window):
+            try:
+                self.report_suppressed(sweep=True)
+            except Exception:
+                pass
+
+    def stop(self):
+        """Stop the reporting thread
+        """
+        self._stopped.set()
+
+
+_logger = logging.getLogger(__name__)
+
+
+def log_suppressed(logger, level, fingerprint, count):
+    """Log summary of `count` records suppressed by sampling
+    """
+    exc_type, location = fingerprint
+    context = LoggingContext()
+    context['exc_type'] = exc_type
+    if location is not None:
+        context['location'] = '%s:%s' % location
+    context['suppressed'] = count
+    logger.log(level, context)
+
+
+_samplers = None
+
+
+def get_log_sampler(level):
+    """Sampler of a logging level from `API_LOG_SAMPLING`,
+    `None` if the level is not sampled
+    """
+    global _samplers
+    if _samplers is None:
+        samplers = {}
+        for key, options in (settings.API_LOG_SAMPLING or {}).items():
+            if isinstance(key, str):
+                level_name = key
+                key = logging.getLevelName(key.upper())
+                if not isinstance(key, int):
+                    raise ImproperlyConfigured(
+                        f'API_LOG_SAMPLING: unknown level {level_name!r}')
+            samplers[key] = LogSampler(**options, level=key)
+        _samplers = samplers
+    return _samplers.get(level)
+
+
+@receiver(setting_changed)
+def _reset_log_samplers(*, setting, **kwargs):
+    global _samplers
+    if setting == 'API_LOG_SAMPLING':
+        for sampler in (_samplers or {}).values():
+            sampler.stop()
+        _samplers = None
+
+
+@atexit.register
+def _flush_log_samplers():
+    for sampler in (_samplers or {}).values():
+        sampler.report_suppressed(flush=True)
+
+
+def report_suppressed(level):
+    """Log summaries of `level` counts not reported with a record yet
+    """
+    sampler = get_log_sampler(level)
+    if sampler is not None:
+        sampler.report_suppressed()
+
+
+def sample_exception(exc, level, logger=None):
+    """Return `(allowed, suppressed)` for logging `exc` at `level`,
+    summaries of suppressed records go to `logger`
+    """
+    sampler = get_log_sampler(level)
+    if sampler is None:
+        return True, 0
+    return sampler.allow(exception_fingerprint(exc), logger)
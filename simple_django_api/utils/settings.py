@@ -1,14 +1,51 @@
+from types import MappingProxyType
+import weakref
+
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+_instances = weakref.WeakSet()
 
 
 class FallbackSettings:
+    """Django settings with defaults
+
+    `API_*` settings are read from a frozen snapshot built on first access
+    and dropped on `setting_changed`, so `override_settings` is honoured.
+    Other names are looked up on Django settings.
+    """
     def __init__(self, **default):
         self._default = {key.upper(): value for key, value in default.items()}
+        self._snapshot = None
+        _instances.add(self)
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            values = dict(self._default)
+            for name in dir(settings):
+                if name.startswith('API_'):
+                    values[name] = getattr(settings, name)
+            snapshot = self._snapshot = MappingProxyType(values)
+        return snapshot
+
+    def clear(self):
+        self._snapshot = None
 
     def __getattr__(self, name):
+        try:
+            return self.snapshot()[name]
+        except KeyError:
+            pass
         try:
             return getattr(settings, name)
         except AttributeError as exc:
-            if name in self._default:
-                return self._default[name]
             raise AttributeError from exc
+
+
+@receiver(setting_changed)
+def _clear_snapshots(*, setting, **kwargs):
+    if setting.startswith('API_'):
+        for instance in _instances:
+            instance.clear()
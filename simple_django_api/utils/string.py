@@ -2,3 +2,9 @@ def ensure_str(raw, encoding='utf8'):
     if hasattr(raw, 'decode'):
         return raw.decode(encoding)
     return raw
+
+
+def ensure_bytes(raw, encoding='utf8'):
+    if hasattr(raw, 'encode'):
+        return raw.encode(encoding)
+    return raw
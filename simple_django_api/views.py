@@ -1,58 +1,180 @@
+import asyncio
+from collections.abc import Iterator
 from http import HTTPStatus
+import inspect
 import logging
 
-from django.conf import settings
-from django.http import HttpResponse
+from asgiref.sync import sync_to_async
+
+from django.db.models import QuerySet
+from django.http.response import HttpResponseBase
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.cache import patch_vary_headers
 from django.utils.decorators import method_decorator
+from django.utils.functional import LazyObject, empty
 
 try:
     from webargs import ValidationError
 except ImportError:
     from .exceptions import ValidationError
 
+from . import renderers
+from .compat import markcoroutinefunction
+from .exceptions import NotAcceptable
+from .permissions import PermissionTable
 from .request import Request
-from .response import APIResponse
-from .utils.logging import LoggingContext
+from .response import APIResponse, StreamingJsonResponse
+from .settings import settings
+from .utils.logging import (LoggingContext, redact, report_suppressed,
+                            sample_exception, truncate)
+
+
+def _redact_fields():
+    return {field.lower() for field in settings.API_LOG_REDACT_FIELDS}
+
+
+def _format_query_params(request):
+    query_params = {
+        key: values[0] if len(values) == 1 else values
+        for key, values in request.query_params.lists()
+    }
+    return truncate(redact(query_params, _redact_fields()),
+                    settings.API_LOG_MAX_QUERY_SIZE)
+
+
+def _format_data(request):
+    # never parse or read the body just for logging
+    raw_request = getattr(request, '_raw_request', request)
+    if hasattr(raw_request, '_post'):
+        data = raw_request._post
+        if hasattr(data, 'lists'):
+            data = {
+                key: values[0] if len(values) == 1 else values
+                for key, values in data.lists()
+            }
+        data = redact(data, _redact_fields())
+    elif hasattr(raw_request, '_body'):
+        # unparsed, possibly malformed, fields cannot be redacted
+        return (f'<{raw_request.content_type or "unknown"}, '
+                f'{len(raw_request._body)} bytes>')
+    else:
+        return '<not read>'
+    return truncate(data, settings.API_LOG_MAX_DATA_SIZE)
+
+
+def _format_user(request):
+    # only a user already loaded, avoid a query
+    user = getattr(request, 'user', None)
+    if user is None:
+        return None
+    if isinstance(user, LazyObject) and user._wrapped is empty:
+        return '<not loaded>'
+    return str(user)
 
 
 class APIView(View):
     method_perms = None
     logger = logging.getLogger(__name__)
+    perm_table = None
+    stream_response_class = StreamingJsonResponse
+    stream_envelope = None
+    stream_chunk_size = None
+    compression = None
+    cache = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        if initkwargs.get('perm_table') is None:
+            method_perms = initkwargs.get('method_perms', cls.method_perms)
+            initkwargs['perm_table'] = PermissionTable(cls, method_perms)
+        return super().as_view(**initkwargs)
+
+    def _get_perm_checkers(self, request):
+        if self.perm_table is None:
+            # view not created by `as_view`
+            self.perm_table = PermissionTable(self.__class__,
+                                              self.method_perms)
+        for perm, perm_checker in self.perm_table.get(request.method):
+            if perm_checker is None:
+                perm_checker = perm(self)
+            yield perm_checker
 
     def _check_permission(self, request, **kwargs):
-        default_perms = getattr(settings, 'API_DEFAULT_PERMS', [])
-        method_perms = self.method_perms or {}
-        perm_lst = method_perms.get(request.method.upper(), None)
-        if perm_lst is None:
-            perm_lst = method_perms.get(request.method.lower(), None)
-        if perm_lst is None:
-            perm_lst = default_perms
-        if not isinstance(perm_lst, (list, tuple)):
-            perm_lst = [perm_lst]
-        for perm in perm_lst:
-            perm_checker = perm(self)
+        for perm_checker in self._get_perm_checkers(request):
             resp = perm_checker(request, **kwargs)
             if resp:
                 return resp
 
+    def _get_exception_handler(self):
+        return settings.API_VIEW_EXCEPTION_HANDLER or self.exception_handler
+
     def _dispatch(self, request, *args, **kwargs):
         return super().dispatch(request, *args, **kwargs)
 
+    def get_renderer(self, request):
+        """Renderer negotiated from `Accept` header,
+        raise `NotAcceptable` if no renderer is acceptable
+        """
+        renderer = renderers.negotiate(request.META.get('HTTP_ACCEPT', ''))
+        if renderer is None:
+            raise NotAcceptable()
+        return renderer
+
+    def _get_error_renderer(self, request):
+        # error responses are always rendered
+        return (renderers.negotiate(request.META.get('HTTP_ACCEPT', ''))
+                or renderers.DEFAULT_RENDERER)
+
+    def render_response(self, request, resp, renderer=None):
+        """Convert handler result into response with `renderer`,
+        negotiated if not given, iterators and QuerySets are always
+        streamed as `stream_response_class` (JSON by default),
+        errors raised while streaming are logged by `log_exception`
+        """
+        if isinstance(resp, HttpResponseBase):
+            return resp
+        if isinstance(resp, (QuerySet, Iterator)):
+            if not renderers.accepts(request.META.get('HTTP_ACCEPT', ''),
+                                     self.stream_response_class.content_type):
+                raise NotAcceptable()
+            resp = self.stream_response_class(
+                resp,
+                envelope=self.stream_envelope,
+                chunk_size=self.stream_chunk_size,
+                on_error=lambda exc: self.log_exception(request, exc),
+            )
+        else:
+            resp = APIResponse(resp,
+                               renderer=renderer or self.get_renderer(request))
+        patch_vary_headers(resp, ['Accept'])
+        return resp
+
+    def finalize_response(self, request, resp, renderer=None):
+        """Render handler result, store it if view has a `cache` policy,
+        response is compressed if view has a `compression` policy
+        """
+        resp = self.render_response(request, resp, renderer)
+        if self.cache is not None:
+            self.cache.store(request, resp)
+        if self.compression is not None:
+            resp = self.compression.apply(request, resp)
+        return resp
+
     @method_decorator(csrf_exempt)
     def dispatch(self, request, *args, **kwargs):
         self.request = request = Request(raw_request=request)
         try:
+            # before the handler, which may have side effects
+            renderer = self.get_renderer(request)
             resp = self._check_permission(request, **kwargs)
+            if not resp and self.cache is not None:
+                resp = self.cache.get_response(request, renderer)
             if not resp:
                 resp = self._dispatch(request, *args, **kwargs)
-            if not isinstance(resp, HttpResponse):
-                resp = APIResponse(resp)
-            return resp
+            return self.finalize_response(request, resp, renderer)
         except Exception as exc:
-            exc_handler = getattr(settings, 'API_VIEW_EXCEPTION_HANDLER',
-                                  self.exception_handler)
+            exc_handler = self._get_exception_handler()
             return exc_handler(request, exc)
 
     def exception_handler(self, request, exc):
@@ -61,16 +183,121 @@ class APIView(View):
             options['status_code'] = HTTPStatus.BAD_REQUEST
             options['user_hint'] = exc.messages
         self.log_exception(request, exc)
-        return APIResponse.from_exception(exc, **options)
+        options['renderer'] = self._get_error_renderer(request)
+        resp = APIResponse.from_exception(exc, **options)
+        patch_vary_headers(resp, ['Accept'])
+        return resp
+
+    def _get_logging_level(self, exc):
+        return getattr(exc, 'logging_level', logging.ERROR)
 
     def log_exception(self, request, exc):
+        """Log request and exception, sampled by `API_LOG_SAMPLING`,
+        fields are only computed if a handler formats the record
+        """
+        level = self._get_logging_level(exc)
+        if not self.logger.isEnabledFor(level):
+            return
+        allowed, suppressed = sample_exception(exc, level, self.logger)
+        report_suppressed(level)
+        if not allowed:
+            return
         context = LoggingContext()
         context['method'] = request.method
         context['path'] = request.path
-        context['query_params'] = request.query_params
-        context['data'] = request.data
-        context['user'] = str(request.user)
+        context.set_lazy('query_params',
+                         lambda: _format_query_params(request))
+        context.set_lazy('data', lambda: _format_data(request))
+        context.set_lazy('user', lambda: _format_user(request))
         context['exc'] = exc
-        level = getattr(exc, 'logging_level', logging.ERROR)
+        if suppressed:
+            context['suppressed'] = suppressed
         exc_info = level >= logging.ERROR
         self.logger.log(level, context, exc_info=exc_info)
+
+
+class AsyncAPIView(APIView):
+    """APIView running natively on the event loop
+
+    `async def` handlers, permissions and exception handler are awaited
+    directly, sync ones are still supported and run through
+    `sync_to_async` since they may touch the ORM (e.g. `request.user`).
+    """
+    # handlers may mix sync and async methods
+    view_is_async = True
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        if not asyncio.iscoroutinefunction(view):
+            markcoroutinefunction(view)
+        return view
+
+    @staticmethod
+    async def _call(func, *args, **kwargs):
+        if asyncio.iscoroutinefunction(func) or asyncio.iscoroutinefunction(
+                getattr(func, '__call__', None)):
+            return await func(*args, **kwargs)
+        resp = await sync_to_async(func)(*args, **kwargs)
+        if inspect.isawaitable(resp):
+            resp = await resp
+        return resp
+
+    async def _check_permission(self, request, **kwargs):
+        for perm_checker in self._get_perm_checkers(request):
+            resp = await self._call(perm_checker, request, **kwargs)
+            if resp:
+                return resp
+
+    async def _dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        handler = self.http_method_not_allowed
+        if method in self.http_method_names:
+            handler = getattr(self, method, self.http_method_not_allowed)
+        return await self._call(handler, request, *args, **kwargs)
+
+    @method_decorator(csrf_exempt)
+    async def dispatch(self, request, *args, **kwargs):
+        self.request = request = Request(raw_request=request)
+        try:
+            # before the handler, which may have side effects
+            renderer = self.get_renderer(request)
+            resp = await self._check_permission(request, **kwargs)
+            if not resp and self.cache is not None:
+                resp = await self.cache.aget_response(request, renderer)
+            if not resp:
+                resp = await self._dispatch(request, *args, **kwargs)
+            return await self.finalize_response(request, resp, renderer)
+        except Exception as exc:
+            exc_handler = self._get_exception_handler()
+            return await self._call(exc_handler, request, exc)
+
+    def render_response(self, request, resp, renderer=None):
+        """QuerySets are rejected, the ASGI handler would iterate them
+        on the event loop
+        """
+        if isinstance(resp, QuerySet):
+            raise TypeError('QuerySet cannot be streamed by an async view, '
+                            'return a list or use APIView')
+        return super().render_response(request, resp, renderer)
+
+    async def finalize_response(self, request, resp, renderer=None):
+        resp = self.render_response(request, resp, renderer)
+        if self.cache is not None:
+            await self.cache.astore(request, resp)
+        if self.compression is not None:
+            resp = self.compression.apply(request, resp)
+        return resp
+
+    async def exception_handler(self, request, exc):
+        options = {}
+        if isinstance(exc, ValidationError):
+            options['status_code'] = HTTPStatus.BAD_REQUEST
+            options['user_hint'] = exc.messages
+        if self.logger.isEnabledFor(self._get_logging_level(exc)):
+            # handlers may block
+            await sync_to_async(self.log_exception)(request, exc)
+        options['renderer'] = self._get_error_renderer(request)
+        resp = APIResponse.from_exception(exc, **options)
+        patch_vary_headers(resp, ['Accept'])
+        return resp
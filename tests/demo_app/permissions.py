@@ -24,3 +24,13 @@ def owner_required(view_cls):
             return APIResponse('not owner')
 
     return inner
+
+
+def async_login_required(view_cls):
+    async def inner(request):
+        # request.user would query the database on the event loop
+        user = await request.auser()
+        if not user.is_authenticated:
+            raise Unauthorized(user_hint=request.jwt_info['case'].name)
+
+    return inner
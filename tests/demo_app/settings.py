@@ -33,6 +33,7 @@ INSTALLED_APPS = (
     'django.contrib.sites',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'simple_django_api.jwt',
 )
 PASSWORD_HASHERS = ('django.contrib.auth.hashers.MD5PasswordHasher', )
 LOGGING = {
@@ -1,8 +1,21 @@
 from django.urls import path
+from simple_django_api.jwt.views import RefreshTokenView
 from . import views
 
 urlpatterns = [
     path('basic_auth', views.BasicAuthView.as_view()),
     path('auth', views.AuthView.as_view()),
     path('blogs/<int:pk>', views.BlogDetailView.as_view()),
+    path('async/auth', views.AsyncAuthView.as_view()),
+    path('async/blogs/<int:pk>', views.AsyncBlogDetailView.as_view()),
+    path('users/export', views.UserExportView.as_view()),
+    path('numbers/<int:count>', views.NumbersView.as_view()),
+    path('failing/numbers/<int:count>', views.FailingNumbersView.as_view()),
+    path('async/users/export', views.AsyncUserExportView.as_view()),
+    path('compressed/numbers/<int:count>',
+         views.CompressedNumbersView.as_view()),
+    path('cached/profile', views.CachedProfileView.as_view()),
+    path('async/cached/numbers/<int:count>',
+         views.AsyncCachedNumbersView.as_view()),
+    path('token/refresh', RefreshTokenView.as_view()),
 ]
@@ -1,5 +1,15 @@
-from simple_django_api.views import APIView
-from .permissions import (BasicAuthRequired, login_required, owner_required)
+import logging
+
+from django.contrib.auth import get_user_model
+
+from simple_django_api.caching import CachePolicy
+from simple_django_api.compression import Compression
+from simple_django_api.exceptions import NotFound
+from simple_django_api.views import APIView, AsyncAPIView
+from .permissions import (BasicAuthRequired, async_login_required,
+                          login_required, owner_required)
+
+User = get_user_model()
 
 
 class BasicAuthView(APIView):
@@ -21,3 +31,83 @@ class BlogDetailView(APIView):
 
     def get(self, request, pk=None):
         return {'pk': pk}
+
+
+class AsyncAuthView(AsyncAPIView):
+    method_perms = {'get': async_login_required, 'post': login_required}
+
+    async def get(self, request):
+        user = await request.auser()
+        return {'username': user.username}
+
+    def post(self, request):
+        return {'username': request.user.username}
+
+
+class AsyncBlogDetailView(AsyncAPIView):
+    async def get(self, request, pk=None):
+        if pk == 0:
+            raise NotFound()
+        return {'pk': pk}
+
+
+class UserExportView(APIView):
+    stream_chunk_size = 2
+
+    def get(self, request):
+        return User.objects.order_by('pk').values('pk', 'username')
+
+
+class NumbersView(APIView):
+    stream_envelope = 'results'
+
+    def get(self, request, count=0):
+        return (i for i in range(count))
+
+
+class FailingNumbersView(APIView):
+    stream_envelope = 'results'
+    logger = logging.getLogger('tests.streaming')
+
+    def get(self, request, count=0):
+        for i in range(count):
+            yield i
+        raise NotFound()
+
+
+class AsyncUserExportView(AsyncAPIView):
+    async def get(self, request):
+        return User.objects.values('pk')
+
+
+class CompressedNumbersView(APIView):
+    compression = Compression(min_size=100, levels={'gzip': 9})
+
+    def get(self, request, count=0):
+        if request.GET.get('stream'):
+            return (i for i in range(count))
+        return list(range(count))
+
+
+class CachedProfileView(APIView):
+    method_perms = {'get': login_required}
+    cache = CachePolicy(ttl=60, vary=['user', 'query'])
+    calls = 0
+
+    def get(self, request):
+        CachedProfileView.calls += 1
+        return {
+            'username': request.user.username,
+            'page': request.GET.get('page'),
+            'calls': self.calls,
+        }
+
+
+class AsyncCachedNumbersView(AsyncAPIView):
+    cache = CachePolicy(ttl=60)
+    compression = Compression(min_size=100)
+    calls = 0
+
+    async def get(self, request, count=0):
+        AsyncCachedNumbersView.calls += 1
+        return list(range(count))
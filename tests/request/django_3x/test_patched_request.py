@@ -1,13 +1,20 @@
 from __future__ import unicode_literals
 
 from io import BytesIO
+import tempfile
+from unittest import skipIf
 
-from django.http import (RawPostDataException, UnreadablePostError)
-from django.test import SimpleTestCase
+from django.core.exceptions import RequestDataTooBig
+from django.http import (QueryDict, RawPostDataException,
+                         UnreadablePostError)
+from django.test import SimpleTestCase, override_settings
 from django.test.client import FakePayload
+from django.utils.datastructures import MultiValueDict
 from django.utils.http import urlencode
 
-from simple_django_api.request import WSGIRequest
+from simple_django_api import compat, parsers
+from simple_django_api.exceptions import InvalidRequestBody, ParamsError
+from simple_django_api.request import ASGIRequest, WSGIRequest
 
 HTTP_METHODS_WITH_BODY = ('POST', 'PUT', 'PATCH')
 
@@ -441,3 +448,223 @@ class PatchedRequestsTests(SimpleTestCase):
             request.encoding = 'GBK'
             self.assertEqual(request.POST, {'name': '浣氬悕'})
 
+
+
+def asgi_request(method, body, content_type='application/json'):
+    body_file = tempfile.SpooledTemporaryFile()
+    body_file.write(body)
+    body_file.seek(0)
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': '/',
+        'headers': [
+            (b'content-type', content_type.encode('latin1')),
+            (b'content-length', str(len(body)).encode('latin1')),
+        ],
+    }
+    return ASGIRequest(scope, body_file)
+
+
+class ASGIRequestTests(SimpleTestCase):
+    def test_data(self):
+        for method in HTTP_METHODS_WITH_BODY:
+            request = asgi_request(method, '{"name": "佚名"}'.encode('utf8'))
+            self.assertEqual(request.data, {'name': '佚名'})
+
+    async def test_adata(self):
+        for method in HTTP_METHODS_WITH_BODY:
+            request = asgi_request(method, b'{"name": "value"}')
+            self.assertEqual(await request.adata(), {'name': 'value'})
+            self.assertEqual(request.body, b'{"name": "value"}')
+
+    async def test_aiter_body(self):
+        payload = b'{"name": "value"}'
+        request = asgi_request('POST', payload)
+        chunks = [chunk async for chunk in request.aiter_body(chunk_size=4)]
+        self.assertEqual(chunks[0], b'{"na')
+        self.assertEqual(b''.join(chunks), payload)
+        # body already loaded
+        request = asgi_request('POST', payload)
+        await request.abody()
+        chunks = [chunk async for chunk in request.aiter_body(chunk_size=4)]
+        self.assertEqual(b''.join(chunks), payload)
+
+    async def test_aiter_body_rolled_to_disk(self):
+        payload = b'{"name": "value"}'
+        request = asgi_request('POST', payload)
+        request._stream.rollover()
+        self.assertEqual(await request.abody(), payload)
+
+    async def test_abody_after_read(self):
+        request = asgi_request('POST', b'{"name": "value"}')
+        self.assertEqual(request.read(2), b'{"')
+        with self.assertRaises(RawPostDataException):
+            await request.abody()
+
+    async def test_abody_too_big(self):
+        request = asgi_request('POST', b'{"name": "value"}')
+        with self.settings(DATA_UPLOAD_MAX_MEMORY_SIZE=2):
+            with self.assertRaises(RequestDataTooBig):
+                await request.abody()
+
+    async def test_invalid_json(self):
+        request = asgi_request('POST', b'{"name": ')
+        with self.assertRaises(InvalidRequestBody):
+            await request.adata()
+
+
+class NdjsonRequestTests(SimpleTestCase):
+    def test_lazy_data(self):
+        payload = FakePayload('{"a": 1}\n\n{"b": "佚名"}\n')
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/x-ndjson',
+            'CONTENT_LENGTH': len(payload),
+            'wsgi.input': payload,
+        })
+        data = request.data
+        self.assertFalse(request._read_started)
+        self.assertEqual(next(data), {'a': 1})
+        self.assertEqual(list(data), [{'b': '佚名'}])
+
+    def test_data_after_body_read(self):
+        payload = FakePayload('{"a": 1}\n{"b": 2}')
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/x-ndjson',
+            'CONTENT_LENGTH': len(payload),
+            'wsgi.input': payload,
+        })
+        request.body
+        self.assertEqual(list(request.data), [{'a': 1}, {'b': 2}])
+
+    def test_invalid_line(self):
+        payload = FakePayload('{"a": 1}\n{"b": ')
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/x-ndjson',
+            'CONTENT_LENGTH': len(payload),
+            'wsgi.input': payload,
+        })
+        data = request.data
+        self.assertEqual(next(data), {'a': 1})
+        with self.assertRaises(InvalidRequestBody):
+            next(data)
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=10)
+    def test_line_too_long(self):
+        payload = FakePayload('{"a": 1}\n{"b": "%s"}\n' % ('x' * 100))
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/x-ndjson',
+            'CONTENT_LENGTH': len(payload),
+            'wsgi.input': payload,
+        })
+        data = request.data
+        self.assertEqual(next(data), {'a': 1})
+        with self.assertRaises(InvalidRequestBody):
+            next(data)
+        # the long line was not read entirely
+        self.assertLess(len(payload.read()), 100)
+
+    def test_used_as_object(self):
+        payload = FakePayload('{"a": 1}\n')
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/x-ndjson',
+            'CONTENT_LENGTH': len(payload),
+            'wsgi.input': payload,
+        })
+        with self.assertRaises(ParamsError):
+            request.data.get('a')
+        with self.assertRaises(ParamsError):
+            request.data['a']
+
+
+@override_settings(API_JSON_MAX_DEPTH=2, API_JSON_MAX_STRING_LENGTH=10)
+class LimitedJsonRequestTests(SimpleTestCase):
+    def test_within_limits(self):
+        payload = FakePayload('{"name": ["佚名"]}')
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': len(payload),
+            'wsgi.input': payload,
+        })
+        self.assertEqual(request.data, {'name': ['佚名']})
+        self.assertEqual(request.body, '{"name": ["佚名"]}'.encode('utf8'))
+
+    def test_alternate_charset(self):
+        payload = FakePayload('{"name": "佚名"}'.encode('GBK'))
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json; charset=GBK',
+            'CONTENT_LENGTH': len(payload),
+            'wsgi.input': payload,
+        })
+        self.assertEqual(request.data, {'name': '佚名'})
+
+    def test_exceeded(self):
+        for body in ['[[[1]]]', '{"name": "%s"}' % ('a' * 11)]:
+            payload = FakePayload(body)
+            request = WSGIRequest({
+                'REQUEST_METHOD': 'POST',
+                'CONTENT_TYPE': 'application/json',
+                'CONTENT_LENGTH': len(payload),
+                'wsgi.input': payload,
+            })
+            with self.assertRaises(InvalidRequestBody):
+                request.data
+
+
+def binary_request(content_type, body):
+    payload = FakePayload(body)
+    return WSGIRequest({
+        'REQUEST_METHOD': 'POST',
+        'CONTENT_TYPE': content_type,
+        'CONTENT_LENGTH': len(payload),
+        'wsgi.input': payload,
+    })
+
+
+def parse_text(request):
+    return request.body.decode('utf8'), MultiValueDict()
+
+
+class ParserRegistryTests(SimpleTestCase):
+    @skipIf(compat.msgpack is None, 'msgpack not installed')
+    def test_msgpack(self):
+        body = compat.msgpack.packb({'name': '佚名'})
+        for content_type in ['application/msgpack', 'application/x-msgpack']:
+            request = binary_request(content_type, body)
+            self.assertEqual(request.data, {'name': '佚名'})
+        with self.assertRaises(InvalidRequestBody):
+            binary_request('application/msgpack', b'\xc1').data
+
+    @skipIf(compat.cbor2 is None, 'cbor2 not installed')
+    def test_cbor(self):
+        body = compat.cbor2.dumps({'name': '佚名'})
+        request = binary_request('application/cbor', body)
+        self.assertEqual(request.data, {'name': '佚名'})
+        with self.assertRaises(InvalidRequestBody):
+            binary_request('application/cbor', body[:-1]).data
+
+    def test_setting(self):
+        path = 'tests.request.django_3x.test_patched_request.parse_text'
+        with override_settings(API_REQUEST_PARSERS={'text/plain': path}):
+            request = binary_request('text/plain', b'hello')
+            self.assertEqual(request.data, 'hello')
+        with override_settings(API_REQUEST_PARSERS={'application/json': None}):
+            request = binary_request('application/json', b'{}')
+            self.assertEqual(request.data, {})
+            self.assertIsInstance(request.data, QueryDict)
+
+    def test_register_parser(self):
+        parsers.register_parser('text/plain', parse_text)
+        try:
+            request = binary_request('text/plain', b'hello')
+            self.assertEqual(request.data, 'hello')
+        finally:
+            parsers.PARSERS.pop('text/plain')
+            parsers._reset_parsers()
@@ -0,0 +1,53 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from simple_django_api.jwt.auth import generate_token
+
+User = get_user_model()
+
+
+class AsyncAPIViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'john',
+            'lennon@thebeatles.com',
+            'johnpassword',
+        )
+
+    async def test_async_permission(self):
+        response = await self.async_client.get('/async/auth')
+        resp_data = response.json()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(resp_data['detail'], 'NO_TOKEN')
+
+    async def test_authenticated(self):
+        token = await sync_to_async(generate_token)(self.__class__.user)
+        response = await self.async_client.get(
+            '/async/auth', AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['username'], 'john')
+
+    async def test_sync_permission(self):
+        response = await self.async_client.post(
+            '/async/auth', {}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_sync_client(self):
+        token = generate_token(self.__class__.user)
+        response = self.client.post('/async/auth',
+                                    HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['username'], 'john')
+
+    async def test_async_handler(self):
+        response = await self.async_client.get('/async/blogs/1')
+        self.assertEqual(response.json(), {'pk': 1})
+
+        response = await self.async_client.get('/async/blogs/0')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_method_not_allowed(self):
+        response = await self.async_client.delete('/async/blogs/1')
+        self.assertEqual(response.status_code, 405)
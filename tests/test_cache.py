@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+from simple_django_api.utils.bloom import BloomFilter
+from simple_django_api.utils.cache import LRUCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class LRUCacheTestCase(TestCase):
+    def test_lru(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats(), {'hits': 3, 'misses': 1, 'size': 2})
+
+    def test_timeout(self):
+        timer = FakeTimer()
+        cache = LRUCache(2, timer=timer)
+        cache.set('a', 1, timeout=10)
+        timer.now = 9
+        self.assertEqual(cache.get('a'), 1)
+        timer.now = 10
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_delete_and_clear(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.delete('a')
+        cache.delete('a')
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', 1)
+        cache.clear()
+        self.assertEqual(cache.stats(), {'hits': 0, 'misses': 0, 'size': 0})
+
+
+class BloomFilterTestCase(TestCase):
+    def test_membership(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'in-{i}')
+        self.assertTrue(all(f'in-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'out-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
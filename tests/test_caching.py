@@ -0,0 +1,129 @@
+import gzip
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from simple_django_api.caching import CachePolicy, is_cacheable
+from simple_django_api.jwt.auth import generate_token
+from simple_django_api.renderers import JsonRenderer
+
+from .demo_app.views import AsyncCachedNumbersView, CachedProfileView
+
+User = get_user_model()
+
+
+class CachePolicyTestCase(SimpleTestCase):
+    def test_key(self):
+        factory = RequestFactory()
+        renderer = JsonRenderer()
+        policy = CachePolicy(vary=['query'])
+        self.assertEqual(
+            policy.get_key(factory.get('/a?x=1&y=2'), renderer),
+            policy.get_key(factory.get('/a?y=2&x=1'), renderer))
+        self.assertNotEqual(
+            policy.get_key(factory.get('/a?x=1'), renderer),
+            policy.get_key(factory.get('/a?x=2'), renderer))
+        self.assertEqual(
+            CachePolicy(vary=[]).get_key(factory.get('/a?x=1'), renderer),
+            CachePolicy(vary=[]).get_key(factory.get('/a?x=2'), renderer))
+
+    def test_user_key(self):
+        factory = RequestFactory()
+        renderer = JsonRenderer()
+        policy = CachePolicy(vary=['user'])
+        keys = []
+        for payload in ({'sub': 1}, {'sub': 2}, None):
+            request = factory.get('/a')
+            request.jwt_info = {'payload': payload}
+            keys.append(policy.get_key(request, renderer))
+        self.assertEqual(len(set(keys)), 3)
+        request = factory.get('/a')
+        request.jwt_info = {'payload': {'name': 'john'}}
+        self.assertEqual(policy.get_key(request, renderer), keys[2])
+
+    def test_unknown_vary(self):
+        with self.assertRaises(ValueError):
+            CachePolicy(vary=['cookie'])
+
+    def test_is_cacheable(self):
+        self.assertTrue(is_cacheable(HttpResponse('ok')))
+        self.assertFalse(is_cacheable(HttpResponse('ok', status=201)))
+        response = HttpResponse('ok')
+        response['Cache-Control'] = 'max-age=0, private'
+        self.assertFalse(is_cacheable(response))
+        response = HttpResponse('ok')
+        response.set_cookie('a', 'b')
+        self.assertFalse(is_cacheable(response))
+
+    def test_django_backend(self):
+        policy = CachePolicy(backend='default')
+        request = RequestFactory().get('/a')
+        renderer = JsonRenderer()
+        self.assertIsNone(policy.get_response(request, renderer))
+        response = HttpResponse(b'{}', content_type='application/json')
+        policy.store(request, response)
+        cached = policy.get_response(RequestFactory().get('/a'), renderer)
+        self.assertEqual(cached.content, b'{}')
+        self.assertEqual(cached['Content-Type'], 'application/json')
+        policy.cache.clear()
+
+
+class CachedViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.john = User.objects.create_user('john')
+        cls.paul = User.objects.create_user('paul')
+
+    def setUp(self):
+        CachedProfileView.cache.clear()
+        AsyncCachedNumbersView.cache.clear()
+
+    def get_profile(self, user=None, **params):
+        headers = {}
+        if user is not None:
+            token = generate_token(user)
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        return self.client.get('/cached/profile', params, **headers)
+
+    def test_hit(self):
+        calls = CachedProfileView.calls
+        first = self.get_profile(self.john, page=1).json()
+        second = self.get_profile(self.john, page=1).json()
+        self.assertEqual(first, second)
+        self.assertEqual(CachedProfileView.calls, calls + 1)
+
+    def test_vary(self):
+        self.get_profile(self.john, page=1)
+        self.assertEqual(self.get_profile(self.john, page=2).json()['page'],
+                         '2')
+        self.assertEqual(
+            self.get_profile(self.paul, page=1).json()['username'], 'paul')
+
+    def test_permission_checked(self):
+        # shared by every user (explicit opt-out), permission must still deny
+        with mock.patch.object(CachedProfileView, 'cache',
+                               CachePolicy(vary=['query'])):
+            self.assertEqual(self.get_profile(self.john).status_code, 200)
+            self.assertEqual(self.get_profile().status_code, 401)
+
+    def test_vary_user_by_default(self):
+        with mock.patch.object(CachedProfileView, 'cache', CachePolicy()):
+            self.get_profile(self.john)
+            self.assertEqual(
+                self.get_profile(self.paul).json()['username'], 'paul')
+
+    def test_async_compressed(self):
+        calls = AsyncCachedNumbersView.calls
+        for _ in range(2):
+            response = self.client.get('/async/cached/numbers/100',
+                                       HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(json.loads(gzip.decompress(response.content)),
+                             list(range(100)))
+        response = self.client.get('/async/cached/numbers/100')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.json(), list(range(100)))
+        self.assertEqual(AsyncCachedNumbersView.calls, calls + 1)
@@ -0,0 +1,78 @@
+import gzip
+import json
+from unittest import skipIf
+
+from django.test import SimpleTestCase, TestCase
+
+from simple_django_api import compat
+from simple_django_api.compression import Compression, parse_accept_encoding
+
+
+class NegotiateTestCase(SimpleTestCase):
+    def test_parse_accept_encoding(self):
+        self.assertEqual(parse_accept_encoding('gzip, br;q=0.5, zstd;q=0'), {
+            'gzip': 1.0,
+            'br': 0.5,
+            'zstd': 0.0
+        })
+        self.assertEqual(parse_accept_encoding(''), {})
+
+    def test_negotiate(self):
+        compression = Compression(encodings=['zstd', 'br', 'gzip'])
+        self.assertIsNone(compression.negotiate(''))
+        self.assertIsNone(compression.negotiate('identity'))
+        self.assertEqual(
+            compression.negotiate('gzip, zstd;q=0, br;q=0').encoding, 'gzip')
+        self.assertEqual(compression.negotiate('*').encoding,
+                         compression.compressors[0].encoding)
+
+
+class CompressionViewTestCase(TestCase):
+    def get(self, count, encoding, **params):
+        return self.client.get(f'/compressed/numbers/{count}',
+                               params,
+                               HTTP_ACCEPT_ENCODING=encoding)
+
+    def test_gzip(self):
+        response = self.get(100, 'gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept, Accept-Encoding')
+        self.assertEqual(json.loads(gzip.decompress(response.content)),
+                         list(range(100)))
+
+    def test_min_size(self):
+        response = self.get(3, 'gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.json(), [0, 1, 2])
+
+    def test_not_accepted(self):
+        response = self.get(100, '')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.json(), list(range(100)))
+
+    def test_streaming(self):
+        response = self.get(3, 'gzip', stream=1)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(json.loads(content), [0, 1, 2])
+
+    @skipIf(compat.brotli is None, 'brotli not installed')
+    def test_brotli(self):
+        for params in [{}, {'stream': 1}]:
+            response = self.get(100, 'br', **params)
+            self.assertEqual(response['Content-Encoding'], 'br')
+            content = b''.join(response) if response.streaming \
+                else response.content
+            self.assertEqual(json.loads(compat.brotli.decompress(content)),
+                             list(range(100)))
+
+    @skipIf(compat.zstandard is None, 'zstandard not installed')
+    def test_zstd(self):
+        for params in [{}, {'stream': 1}]:
+            response = self.get(100, 'zstd, gzip', **params)
+            self.assertEqual(response['Content-Encoding'], 'zstd')
+            content = b''.join(response) if response.streaming \
+                else response.content
+            decompressor = compat.zstandard.ZstdDecompressor()
+            content = decompressor.decompressobj().decompress(content)
+            self.assertEqual(json.loads(content), list(range(100)))
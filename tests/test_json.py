@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+import json
+from unittest import skipIf
+import uuid
+
+from django.test import SimpleTestCase, override_settings
+
+from simple_django_api.exceptions import InvalidRequestBody
+from simple_django_api.request import parse_json_body
+from simple_django_api.response import JsonResponse
+from simple_django_api.utils import json as json_utils
+
+
+def backend_available(name):
+    try:
+        json_utils.load_backend(name)
+    except ImportError:
+        return False
+    return True
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+class JsonBackendTestCase(SimpleTestCase):
+    payload = {
+        'id': uuid.UUID('12345678123456781234567812345678'),
+        'created': datetime(2021, 3, 22, 10, 30),
+        'price': Decimal('1.10'),
+        'point': Point(1, 2),
+        'name': '佚名',
+    }
+
+    def check_backend(self, name, decimal='1.10'):
+        backend = json_utils.load_backend(name)
+        content = backend.dumps(self.payload)
+        self.assertIsInstance(content, bytes)
+        data = backend.loads(content)
+        self.assertEqual(data['id'], '12345678-1234-5678-1234-567812345678')
+        self.assertTrue(data['created'].startswith('2021-03-22T10:30:00'))
+        self.assertEqual(data['price'], decimal)
+        self.assertEqual(data['point'], {'x': 1, 'y': 2})
+        self.assertEqual(data['name'], '佚名')
+        self.assertIn('佚名'.encode('utf8'), content)
+        content = backend.dumps({'name': '佚名'}, ensure_ascii=True)
+        # separators differ between backends
+        self.assertIn(b'"\\u4f5a\\u540d"', content)
+        self.assertEqual(json.loads(content), {'name': '佚名'})
+
+    def test_stdlib(self):
+        self.check_backend('json')
+
+    @skipIf(not backend_available('ujson'), 'ujson not installed')
+    def test_ujson(self):
+        # ujson encodes Decimal natively, as a number
+        self.check_backend('ujson', decimal=1.1)
+
+    @skipIf(not backend_available('orjson'), 'orjson not installed')
+    def test_orjson(self):
+        self.check_backend('orjson')
+
+    @skipIf(not backend_available('msgspec'), 'msgspec not installed')
+    def test_msgspec(self):
+        self.check_backend('msgspec')
+
+    def test_dotted_path(self):
+        backend = json_utils.load_backend(
+            'simple_django_api.utils.json.StdlibJsonBackend')
+        self.assertIsInstance(backend, json_utils.StdlibJsonBackend)
+
+    def test_setting_changed(self):
+        with override_settings(API_JSON_BACKEND='json'):
+            self.assertIsInstance(json_utils.get_backend(),
+                                  json_utils.StdlibJsonBackend)
+            response = JsonResponse(self.payload)
+            self.assertEqual(
+                json.loads(response.content)['point'], {'x': 1, 'y': 2})
+            self.assertEqual(parse_json_body(b'{"a": 1}'), {'a': 1})
+            self.assertEqual(
+                parse_json_body('{"a": "佚名"}'.encode('GBK'),
+                                encoding='GBK'), {'a': '佚名'})
+            with self.assertRaises(InvalidRequestBody):
+                parse_json_body(b'{"a": ')
+
+
+class JsonLimitScannerTestCase(SimpleTestCase):
+    document = json.dumps({
+        'a': [1, 2, {
+            'b': 'x\\"y' * 10
+        }],
+        'c': '[{,"',
+    }).encode()
+
+    def scan(self, chunk_size=3, **limits):
+        scanner = json_utils.JsonLimitScanner(**limits)
+        for start in range(0, len(self.document), chunk_size):
+            scanner.feed(self.document[start:start + chunk_size])
+        return scanner
+
+    def test_within_limits(self):
+        for chunk_size in [1, 2, 3, 7, 100]:
+            scanner = self.scan(chunk_size,
+                                max_depth=3,
+                                max_string_length=60,
+                                max_elements=6)
+            self.assertEqual(scanner.depth, 0)
+            self.assertEqual(scanner.elements, 6)
+
+    def test_exceeded(self):
+        for chunk_size in [1, 2, 3, 7, 100]:
+            for limits in [{
+                    'max_depth': 2
+            }, {
+                    'max_string_length': 59
+            }, {
+                    'max_elements': 5
+            }]:
+                with self.assertRaises(json_utils.JsonLimitExceeded):
+                    self.scan(chunk_size, **limits)
+
+    def test_count_items(self):
+        for document, items in [(b'[]', 0), (b'{}', 0), (b'[[]]', 1),
+                                (b'[""]', 1), (b'{"a": []}', 1),
+                                (b' [ [ ] , [ 1 ] ] ', 3), (b'"a"', 0)]:
+            for chunk_size in [1, 2, 100]:
+                scanner = json_utils.JsonLimitScanner()
+                for start in range(0, len(document), chunk_size):
+                    scanner.feed(document[start:start + chunk_size])
+                self.assertEqual(scanner.elements, items, document)
+
+    def test_deeply_nested(self):
+        scanner = json_utils.JsonLimitScanner(max_depth=64)
+        with self.assertRaises(json_utils.JsonLimitExceeded):
+            scanner.feed(b'[' * 100000 + b']' * 100000)
@@ -1,10 +1,34 @@
+import asyncio
+import copy
+import json
+import os
+import pickle
+import tempfile
 import time
+from unittest import mock
 
+from asgiref.sync import async_to_sync
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.auth.models import Permission
+from django.test import (AsyncRequestFactory, RequestFactory, TestCase,
+                         override_settings)
+from django.utils import timezone
+import jwt
 
-from simple_django_api.jwt.auth import generate_token
+from simple_django_api.jwt.auth import (authenticate, decode, generate_token,
+                                        generate_refresh_token,
+                                        generate_tokens,
+                                        get_decode_cache, get_token_user,
+                                        get_user)
+from simple_django_api.jwt.consts import TokenCase
+from simple_django_api.jwt.keys import UnknownKeyError, get_key_ring
+from simple_django_api.jwt.middleware import AuthenticationMiddleware
+from simple_django_api.jwt.revocation import (RevocationList,
+                                              get_revocation_list, revoke)
+from simple_django_api.jwt.token_user import TokenUser
+from simple_django_api.jwt.user_cache import get_user_cache, invalidate_user
+from simple_django_api.permissions import LoginRequired
 
 User = get_user_model()
 
@@ -65,3 +89,402 @@ class JwtTestCase(TestCase):
         resp_data = response.json()
         self.assertEqual(response.status_code, 401)
         self.assertEqual(resp_data['detail'], 'EXPIRED')
+
+
+class DecodeCacheTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('john')
+
+    def test_cached(self):
+        token = generate_token(self.__class__.user)
+        cache = get_decode_cache()
+        cache.clear()
+        payload = decode(token)
+        self.assertEqual(cache.stats()['misses'], 1)
+        payload['sub'] = 'changed'
+        self.assertEqual(decode(token)['sub'], self.__class__.user.pk)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_invalid_token_not_cached(self):
+        cache = get_decode_cache()
+        cache.clear()
+        with self.assertRaises(jwt.DecodeError):
+            decode('invalid')
+        self.assertEqual(len(cache), 0)
+
+    def test_disabled(self):
+        with self.settings(API_JWT_DECODE_CACHE_SIZE=0):
+            self.assertIsNone(get_decode_cache())
+            token = generate_token(self.__class__.user)
+            self.assertEqual(decode(token)['sub'], self.__class__.user.pk)
+
+
+class UserCacheTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('john')
+
+    def test_local(self):
+        pk = self.__class__.user.pk
+        with self.settings(API_JWT_USER_CACHE_BACKEND='local'):
+            self.assertEqual(get_user(pk).username, 'john')
+            with self.assertNumQueries(0):
+                user = get_user(pk)
+            user.username = 'changed'
+            self.assertEqual(get_user(pk).username, 'john')
+            user.save()
+            with self.assertNumQueries(1):
+                self.assertEqual(get_user(pk).username, 'changed')
+            user.delete()
+            self.assertFalse(get_user(pk).is_authenticated)
+
+    def test_local_not_shared(self):
+        pk = self.__class__.user.pk
+        with self.settings(API_JWT_USER_CACHE_BACKEND='local',
+                           API_JWT_USER_SELECT_RELATED=[]):
+            get_user(pk)
+            first, second = get_user(pk), get_user(pk)
+            self.assertIsNot(first._state, second._state)
+            first._prefetched_objects_cache = {'groups': []}
+            self.assertFalse(hasattr(second, '_prefetched_objects_cache'))
+            self.assertFalse(first._state.adding)
+            self.assertEqual(first._state.db, 'default')
+
+    def test_invalidate_after_update(self):
+        pk = self.__class__.user.pk
+        with self.settings(API_JWT_USER_CACHE_BACKEND='local'):
+            get_user(pk)
+            User.objects.filter(pk=pk).update(is_active=False)
+            self.assertTrue(get_user(pk).is_active)
+            invalidate_user(pk)
+            self.assertFalse(get_user(pk).is_active)
+
+    def test_django(self):
+        pk = self.__class__.user.pk
+        with self.settings(API_JWT_USER_CACHE_BACKEND='django'):
+            get_user_cache().delete(pk)
+            get_user(pk)
+            with self.assertNumQueries(0):
+                self.assertEqual(get_user(pk).username, 'john')
+            get_user_cache().delete(pk)
+
+    def test_disabled(self):
+        self.assertIsNone(get_user_cache())
+        with self.assertNumQueries(1):
+            get_user(self.__class__.user.pk)
+
+    def test_only(self):
+        with self.settings(API_JWT_USER_ONLY=['id', 'username']):
+            user = get_user(self.__class__.user.pk)
+        self.assertEqual(user.get_deferred_fields(),
+                         {f.attname
+                          for f in User._meta.concrete_fields} -
+                         {'id', 'username'})
+
+
+class TokenUserTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('john', is_staff=True)
+
+    def test_no_query(self):
+        with self.settings(API_JWT_TOKEN_USER=True,
+                           API_JWT_TOKEN_USER_CLAIMS=['username']):
+            token = generate_token(self.__class__.user)
+            with self.assertNumQueries(0):
+                response = self.client.get(
+                    '/auth', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['username'], 'john')
+
+    def test_token_user(self):
+        user = self.__class__.user
+        with self.settings(API_JWT_TOKEN_USER_CLAIMS=['username', 'is_staff']):
+            token_user = get_token_user(decode(generate_token(user)))
+        self.assertEqual(token_user.pk, user.pk)
+        self.assertTrue(token_user.is_authenticated)
+        self.assertTrue(token_user.is_staff)
+        self.assertFalse(token_user.is_superuser)
+        self.assertEqual(token_user.username, 'john')
+        with self.assertRaises(AttributeError):
+            token_user.email
+        with self.assertRaises(AttributeError):
+            token_user.username = 'changed'
+        with self.assertNumQueries(1):
+            self.assertEqual(token_user.get_user(), user)
+            self.assertEqual(token_user.get_user(), user)
+
+    def test_copy(self):
+        token_user = get_token_user(decode(generate_token(self.user)))
+        for copied in (copy.copy(token_user), copy.deepcopy(token_user),
+                       pickle.loads(pickle.dumps(token_user))):
+            self.assertEqual(copied, token_user)
+            self.assertEqual(copied.claims, token_user.claims)
+
+    def test_permissions(self):
+        user = self.__class__.user
+        user.user_permissions.add(
+            Permission.objects.get(codename='view_user'))
+        token_user = get_token_user(decode(generate_token(user)))
+        self.assertTrue(token_user.has_perm('auth.view_user'))
+        self.assertFalse(
+            token_user.has_perms(['auth.view_user', 'auth.change_user']))
+        self.assertTrue(token_user.has_module_perms('auth'))
+        self.assertEqual(token_user.get_all_permissions(),
+                         {'auth.view_user'})
+        self.assertEqual(list(token_user.groups.all()), [])
+        # the user is gone, permissions are denied like `AnonymousUser`
+        gone = TokenUser(0)
+        self.assertFalse(gone.has_perm('auth.view_user'))
+        self.assertEqual(gone.get_all_permissions(), set())
+
+
+class KeyRingTestCase(TestCase):
+    keys = {'a': {'key': 'key a'}, 'b': {'key': 'key b'}}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('john')
+
+    def test_kid(self):
+        user = self.__class__.user
+        legacy_token = generate_token(user)
+        with self.settings(API_JWT_KEYS=self.keys, API_JWT_SIGNING_KID='a'):
+            token = generate_token(user)
+            self.assertEqual(jwt.get_unverified_header(token)['kid'], 'a')
+            self.assertEqual(decode(legacy_token)['sub'], user.pk)
+            with self.settings(API_JWT_SIGNING_KID='b'):
+                self.assertEqual(decode(token)['sub'], user.pk)
+                self.assertEqual(
+                    jwt.get_unverified_header(generate_token(user))['kid'],
+                    'b')
+        with self.assertRaises(UnknownKeyError):
+            decode(token)
+
+    def test_unknown_kid(self):
+        token = jwt.encode({'sub': 1}, 'some key', headers={'kid': 'c'})
+        request = RequestFactory().get('/',
+                                       HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(authenticate(request)[1]['case'],
+                         TokenCase.INVALID_TOKEN)
+
+    def test_jwks_reload(self):
+        user = self.__class__.user
+        jwk = {'kty': 'oct', 'kid': 'j', 'alg': 'HS256', 'k': 'a2V5IGo'}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'jwks.json')
+            with open(path, 'w') as fp:
+                json.dump({'keys': [jwk]}, fp)
+            with self.settings(API_JWT_JWKS_FILE=path,
+                               API_JWT_JWKS_RELOAD_INTERVAL=0,
+                               API_JWT_SIGNING_KID='j'):
+                self.assertIn('j', get_key_ring())
+                token = generate_token(user)
+                self.assertEqual(decode(token)['sub'], user.pk)
+                with open(path, 'w') as fp:
+                    json.dump({'keys': []}, fp)
+                os.utime(path, ns=(0, 0))
+                with self.assertRaises(UnknownKeyError):
+                    decode(token)
+
+
+@override_settings(API_JWT_REVOCATION=True)
+class RevocationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('john')
+
+    def authenticate(self, token):
+        request = RequestFactory().get('/',
+                                       HTTP_AUTHORIZATION=f'Bearer {token}')
+        return authenticate(request)
+
+    def test_revoke(self):
+        token = generate_token(self.__class__.user)
+        user, jwt_info = self.authenticate(token)
+        self.assertEqual(jwt_info['case'], TokenCase.OK)
+        self.assertEqual(user, self.__class__.user)
+        revoke(jwt_info['payload'])
+        user, jwt_info = self.authenticate(token)
+        self.assertEqual(jwt_info['case'], TokenCase.REVOKED)
+        self.assertFalse(user.is_authenticated)
+
+    def test_no_store_query(self):
+        token = generate_token(self.__class__.user)
+        get_revocation_list().refresh(force=True)
+        with self.assertNumQueries(1):
+            # user only
+            self.assertEqual(self.authenticate(token)[1]['case'],
+                             TokenCase.OK)
+
+    def test_other_process(self):
+        token = generate_token(self.__class__.user)
+        revocation_list = get_revocation_list()
+        revocation_list.refresh(force=True)
+        revocation_list.store.revoke(decode(token)['jti'])
+        self.assertEqual(self.authenticate(token)[1]['case'], TokenCase.OK)
+        revocation_list.refresh(force=True)
+        self.assertEqual(self.authenticate(token)[1]['case'],
+                         TokenCase.REVOKED)
+
+    def test_delta_refresh(self):
+        store = mock.Mock()
+        store.iter_revoked.return_value = ['a']
+        store.iter_revoked_since.return_value = ['b']
+        revocation_list = RevocationList(store, refresh_interval=0)
+        revocation_list.refresh()
+        revocation_list.refresh()
+        store.iter_revoked.assert_called_once()
+        since = store.iter_revoked_since.call_args[0][0]
+        self.assertLess(since, timezone.now())
+        store.is_revoked.return_value = True
+        self.assertTrue(revocation_list.is_revoked('b'))
+        # full, rebuilt from the whole store
+        store.iter_revoked_since.return_value = ['c'] * 2000
+        revocation_list.refresh()
+        self.assertEqual(store.iter_revoked.call_count, 2)
+
+
+class RefreshTokenTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('john')
+
+    def refresh(self, token):
+        return self.client.post('/token/refresh', {'refresh': token},
+                                content_type='application/json')
+
+    def test_rotate(self):
+        token = generate_refresh_token(self.__class__.user)
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        tokens = response.json()
+        response = self.client.get(
+            '/auth', HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.assertEqual(response.json()['username'], 'john')
+        self.assertEqual(decode(tokens['refresh'])['fam'],
+                         decode(token)['fam'])
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 200)
+
+    @override_settings(API_JWT_REVOCATION=True)
+    def test_reuse(self):
+        token = generate_refresh_token(self.__class__.user)
+        tokens = self.refresh(token).json()
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'REUSED')
+        # the whole family is revoked
+        self.assertEqual(self.refresh(tokens['refresh']).json()['detail'],
+                         'REUSED')
+        response = self.client.get(
+            '/auth', HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.assertEqual(response.json()['detail'], 'REVOKED')
+
+    def test_token_type(self):
+        refresh_token = generate_refresh_token(self.__class__.user)
+        response = self.client.get(
+            '/auth', HTTP_AUTHORIZATION=f'Bearer {refresh_token}')
+        self.assertEqual(response.json()['detail'], 'INVALID_TOKEN')
+        access_token = generate_token(self.__class__.user)
+        self.assertEqual(self.refresh(access_token).json()['detail'],
+                         'INVALID_TOKEN')
+        self.assertEqual(self.refresh('').status_code, 400)
+
+    def test_body(self):
+        for body in ([], 'token', 1):
+            response = self.client.post('/token/refresh', body,
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        for token in (5, ['token'], {'token': 'x'}):
+            self.assertEqual(self.refresh(token).status_code, 400)
+
+    @override_settings(API_JWT_REVOCATION=True)
+    def test_token_not_logged(self):
+        token = generate_refresh_token(self.__class__.user)
+        self.refresh(token)
+        with self.assertLogs('simple_django_api.views', 'WARNING') as logs:
+            self.assertEqual(self.refresh(token).status_code, 401)
+        message = logs.records[0].getMessage()
+        self.assertIn("[data: {'refresh': '********'}]", message)
+        self.assertNotIn(token, message)
+
+    @override_settings(API_DEFAULT_PERMS=[LoginRequired])
+    def test_default_perms_ignored(self):
+        token = generate_refresh_token(self.__class__.user)
+        self.assertEqual(self.refresh(token).status_code, 200)
+
+
+class AsyncMiddlewareTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('john')
+
+    def get_request(self, token):
+        request = AsyncRequestFactory().get('/')
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        return request
+
+    def test_async(self):
+        async def get_response(request):
+            self.assertEqual(request.jwt_info['case'], TokenCase.OK)
+            self.assertFalse(hasattr(request, '_jwt_user'))
+            return await request.auser()
+
+        middleware = AuthenticationMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        token = generate_token(self.__class__.user)
+        request = self.get_request(token)
+        self.assertEqual(async_to_sync(middleware)(request),
+                         self.__class__.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(request.user.username, 'john')
+
+    @override_settings(API_JWT_JWKS_FILE='/nonexistent/jwks.json')
+    def test_check_token_off_loop(self):
+        def check_token(request):
+            with self.assertRaises(RuntimeError):
+                asyncio.get_running_loop()
+            return {'case': TokenCase.NO_TOKEN, 'payload': None}
+
+        async def get_response(request):
+            return request.jwt_info
+
+        middleware = AuthenticationMiddleware(get_response)
+        with mock.patch('simple_django_api.jwt.auth.check_token',
+                        check_token):
+            jwt_info = async_to_sync(middleware)(self.get_request(''))
+        self.assertEqual(jwt_info['case'], TokenCase.NO_TOKEN)
+
+    def test_sync(self):
+        middleware = AuthenticationMiddleware(lambda request: request)
+        self.assertFalse(asyncio.iscoroutinefunction(middleware))
+        token = generate_token(self.__class__.user)
+        request = middleware(self.get_request(token))
+        self.assertEqual(request.user.username, 'john')
+        self.assertEqual(async_to_sync(request.auser)(), self.__class__.user)
+
+
+class GenerateTokensTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(User(username=f'user{i}') for i in range(5))
+
+    def test_serial(self):
+        users = User.objects.order_by('pk')
+        results = list(generate_tokens(users, scope='device'))
+        self.assertEqual([user for user, _ in results], list(users))
+        for user, token in results:
+            payload = decode(token)
+            self.assertEqual(payload['sub'], user.pk)
+            self.assertEqual(payload['scope'], 'device')
+
+    def test_process_pool(self):
+        users = list(User.objects.order_by('pk'))
+        with self.settings(API_JWT_KEYS={'a': {'key': 'key a'}},
+                           API_JWT_SIGNING_KID='a'):
+            results = list(generate_tokens(users, processes=2, chunk_size=2))
+            self.assertEqual([user for user, _ in results], users)
+            for user, token in results:
+                self.assertEqual(jwt.get_unverified_header(token)['kid'], 'a')
+                self.assertEqual(decode(token)['sub'], user.pk)
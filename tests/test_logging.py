@@ -0,0 +1,349 @@
+import gc
+from io import BytesIO
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from unittest import mock
+import weakref
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.functional import SimpleLazyObject
+
+from simple_django_api import exceptions
+from simple_django_api.request import Request
+from simple_django_api.utils.logging import (LoggingContext, LogSampler,
+                                             NdjsonFormatter,
+                                             NdjsonQueueListener,
+                                             QueuedNdjsonHandler,
+                                             exception_fingerprint,
+                                             get_log_sampler, truncate)
+from simple_django_api.views import APIView
+
+
+class LoggingContextTestCase(SimpleTestCase):
+    def test_lazy(self):
+        func = mock.Mock(return_value='value')
+        context = LoggingContext()
+        context['key'] = 1
+        context.set_lazy('lazy', func)
+        func.assert_not_called()
+        self.assertEqual(str(context), '[key: 1] [lazy: value]')
+        str(context)
+        func.assert_called_once()
+
+    def test_truncate(self):
+        self.assertEqual(truncate('abc', 3), 'abc')
+        self.assertEqual(truncate('abcd', 3), 'abc...(4 bytes)')
+        self.assertEqual(truncate('ééé', 3), 'é...(6 bytes)')
+        self.assertEqual(truncate(b'ab', None), "b'ab'")
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class LogSamplerTestCase(SimpleTestCase):
+    def test_sampling(self):
+        timer = FakeTimer()
+        sampler = LogSampler(limit=2, window=10, timer=timer)
+        self.assertEqual([sampler.allow('a') for _ in range(4)],
+                         [(True, 0), (True, 0), (False, 0), (False, 0)])
+        self.assertEqual(sampler.allow('b'), (True, 0))
+        timer.now = 10
+        self.assertEqual(sampler.allow('a'), (True, 2))
+        self.assertEqual(sampler.allow('a'), (True, 0))
+
+    def test_maxsize(self):
+        sampler = LogSampler(limit=1, maxsize=2)
+        for key in 'abc':
+            sampler.allow(key)
+        self.assertEqual(sampler.allow('a'), (True, 0))
+
+    def test_storm_stopped(self):
+        timer = FakeTimer()
+        sampler = LogSampler(limit=1, window=10, timer=timer)
+        for _ in range(3):
+            sampler.allow('a')
+        self.assertEqual(sampler.pop_suppressed(), [])
+        timer.now = 10
+        # any later record reports the ended window of 'a'
+        self.assertEqual(sampler.allow('b'), (True, 0))
+        self.assertEqual(sampler.pop_suppressed(), [('a', 2)])
+        self.assertEqual(sampler.pop_suppressed(), [])
+        self.assertEqual(sampler.allow('a'), (True, 0))
+
+    def test_evicted(self):
+        sampler = LogSampler(limit=1, maxsize=1)
+        for _ in range(3):
+            sampler.allow('a')
+        sampler.allow('b')
+        self.assertEqual(sampler.pop_suppressed(), [('a', 2)])
+
+    def test_flush(self):
+        sampler = LogSampler(limit=1)
+        for _ in range(3):
+            sampler.allow('a')
+        self.assertEqual(sampler.flush(), [('a', 2)])
+        self.assertEqual(sampler.flush(), [])
+
+    def test_report_suppressed(self):
+        logger = logging.getLogger('tests.sampling')
+        sampler = LogSampler(limit=1, level=logging.WARNING)
+        self.addCleanup(sampler.stop)
+        for _ in range(3):
+            sampler.allow(('ValueError', ('app.py', 1)), logger)
+        with self.assertLogs('tests.sampling', 'WARNING') as logs:
+            sampler.report_suppressed(flush=True)
+        self.assertEqual(
+            logs.records[0].getMessage(),
+            '[exc_type: ValueError] [location: app.py:1] [suppressed: 2]')
+
+    def test_unknown_level(self):
+        with override_settings(API_LOG_SAMPLING={'WARN1NG': {}}):
+            with self.assertRaises(ImproperlyConfigured):
+                get_log_sampler(logging.WARNING)
+
+    def test_fingerprint(self):
+        def fail():
+            raise ValueError()
+
+        fingerprints = set()
+        for _ in range(2):
+            try:
+                fail()
+            except ValueError as exc:
+                fingerprints.add(exception_fingerprint(exc))
+        self.assertEqual(len(fingerprints), 1)
+        name, (_, lineno) = fingerprints.pop()
+        self.assertEqual(name, 'builtins.ValueError')
+        self.assertEqual(lineno, fail.__code__.co_firstlineno + 1)
+
+
+class LogExceptionTestCase(SimpleTestCase):
+    def setUp(self):
+        self.view = APIView()
+        self.view.logger = logging.getLogger('tests.log_exception')
+
+    def post(self, data):
+        raw_request = RequestFactory().post('/path?token=abc&page=1',
+                                            data,
+                                            content_type='application/json')
+        raw_request.user = SimpleLazyObject(lambda: 'john')
+        return Request(raw_request)
+
+    def test_disabled(self):
+        request = self.post({})
+        self.view.logger.setLevel(logging.ERROR)
+        self.addCleanup(self.view.logger.setLevel, logging.NOTSET)
+        with mock.patch('simple_django_api.views.LoggingContext') as context:
+            self.view.log_exception(request, exceptions.NotFound())
+        context.assert_not_called()
+
+    @override_settings(API_LOG_MAX_DATA_SIZE=40)
+    def test_fields(self):
+        request = self.post({'password': 'secret', 'name': 'x' * 100})
+        request.data
+        with self.assertLogs('tests.log_exception', 'WARNING') as logs:
+            self.view.log_exception(request, exceptions.NotFound())
+        message = logs.records[0].getMessage()
+        self.assertIn("[query_params: {'token': '********', 'page': '1'}]",
+                      message)
+        self.assertIn("[data: {'password': '********', 'name': 'xxxxx", message)
+        self.assertIn('...(', message)
+        self.assertIn('[user: <not loaded>]', message)
+        self.assertNotIn('secret', message)
+
+    def test_body_not_parsed(self):
+        request = self.post({'name': 'x'})
+        with self.assertLogs('tests.log_exception', 'WARNING') as logs:
+            self.view.log_exception(request, exceptions.NotFound())
+        self.assertIn('[data: <not read>]', logs.records[0].getMessage())
+        request.user.upper()
+        with self.assertLogs('tests.log_exception', 'WARNING') as logs:
+            self.view.log_exception(request, exceptions.NotFound())
+        self.assertIn('[user: john]', logs.records[0].getMessage())
+
+    def test_body_not_parsable(self):
+        raw_request = RequestFactory().post('/path',
+                                            b'{"password": "secret",',
+                                            content_type='application/json')
+        request = Request(raw_request)
+        with self.assertRaises(exceptions.InvalidRequestBody) as cm:
+            request.data
+        with self.assertLogs('tests.log_exception', 'WARNING') as logs:
+            self.view.log_exception(request, cm.exception)
+        message = logs.records[0].getMessage()
+        self.assertIn('[data: <application/json, 22 bytes>]', message)
+        self.assertNotIn('secret', message)
+        self.assertNotIn('password', message)
+
+    @override_settings(API_LOG_SAMPLING={'WARNING': {'limit': 2}})
+    def test_sampling(self):
+        request = self.post({})
+        with self.assertLogs('tests.log_exception', 'WARNING') as logs:
+            for _ in range(5):
+                try:
+                    raise exceptions.NotFound()
+                except exceptions.NotFound as exc:
+                    self.view.log_exception(request, exc)
+            self.view.log_exception(request, exceptions.Forbidden())
+        self.assertEqual(len(logs.records), 3)
+
+    @override_settings(API_LOG_SAMPLING={'WARNING': {'limit': 1,
+                                                     'window': 10}})
+    def test_summary_after_storm(self):
+        request = self.post({})
+        timer = FakeTimer()
+        get_log_sampler(logging.WARNING).timer = timer
+        with self.assertLogs('tests.log_exception', 'WARNING') as logs:
+            for _ in range(3):
+                try:
+                    raise exceptions.NotFound()
+                except exceptions.NotFound as exc:
+                    self.view.log_exception(request, exc)
+            timer.now = 10
+            self.view.log_exception(request, exceptions.Forbidden())
+        self.assertEqual(len(logs.records), 3)
+        summary = logs.records[1].getMessage()
+        self.assertIn('[exc_type: simple_django_api.exceptions.NotFound]',
+                      summary)
+        self.assertIn('[suppressed: 2]', summary)
+
+    @override_settings(API_LOG_SAMPLING={'WARNING': {'limit': 1,
+                                                     'window': 0.05}})
+    def test_summary_without_new_record(self):
+        request = self.post({})
+        with self.assertLogs('tests.log_exception', 'WARNING') as logs:
+            for _ in range(3):
+                try:
+                    raise exceptions.NotFound()
+                except exceptions.NotFound as exc:
+                    self.view.log_exception(request, exc)
+            # reported by the sampler thread
+            deadline = time.monotonic() + 5
+            while len(logs.records) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('[suppressed: 2]', logs.records[1].getMessage())
+
+
+class QueuedNdjsonHandlerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('tests.ndjson')
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, 'propagate', True)
+
+    def add_handler(self, handler):
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+        self.addCleanup(handler.close)
+
+    def test_write(self):
+        stream = BytesIO()
+        handler = QueuedNdjsonHandler(stream, batch_size=2)
+        self.add_handler(handler)
+        func = mock.Mock(return_value='lazy value')
+        context = LoggingContext()
+        context['path'] = '/path'
+        context.set_lazy('lazy', func)
+        self.logger.warning(context)
+        # resolved on the logging thread
+        func.assert_called_once()
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            self.logger.exception('failed %s', 'here')
+        handler.close()
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]['path'], '/path')
+        self.assertEqual(lines[0]['lazy'], 'lazy value')
+        self.assertEqual(lines[0]['level'], 'WARNING')
+        self.assertEqual(lines[1]['message'], 'failed here')
+        self.assertIn('ValueError: boom', lines[1]['exc_info'])
+
+    def test_dropped(self):
+        handler = QueuedNdjsonHandler(BytesIO(), maxsize=1)
+        self.add_handler(handler)
+        # no listener draining the queue
+        handler._ensure_listener = mock.Mock()
+        for i in range(3):
+            self.logger.warning('message %s', i)
+        self.assertEqual(handler.dropped, 2)
+
+    def test_prepare_drops_traceback(self):
+        handler = QueuedNdjsonHandler(BytesIO())
+        self.addCleanup(handler.close)
+        context = LoggingContext()
+        context['exc'] = ValueError('boom')
+        refs = []
+
+        def fail():
+            request = mock.Mock()
+            refs.append(weakref.ref(request))
+            raise ValueError('boom')
+
+        try:
+            fail()
+        except ValueError:
+            record = self.logger.makeRecord(self.logger.name, logging.ERROR,
+                                            __file__, 1, context, None,
+                                            sys.exc_info())
+        record = handler.prepare(record)
+        self.assertIsNone(record.exc_info)
+        self.assertIsNone(record.args)
+        self.assertEqual(record.msg['exc'], 'boom')
+        # frames are not kept, the traceback is formatted by the listener
+        gc.collect()
+        self.assertIsNone(refs[0]())
+        self.assertIsNone(record.exc_text)
+        line = json.loads(NdjsonFormatter().format(record))
+        self.assertIn('in fail', line['exc_info'])
+        self.assertIn("raise ValueError('boom')", line['exc_info'])
+        self.assertTrue(line['exc_info'].endswith('ValueError: boom'))
+
+    def test_report_dropped(self):
+        stream = BytesIO()
+        dropped = mock.Mock(return_value=3)
+        listener = NdjsonQueueListener(queue.Queue(), stream,
+                                       dropped=dropped, report_interval=0)
+        listener.start()
+        listener.queue.put(self.logger.makeRecord(
+            self.logger.name, logging.WARNING, __file__, 1, 'message', None,
+            None))
+        listener.stop()
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(lines[-1]['dropped'], 3)
+        self.assertEqual(lines[-1]['level'], 'WARNING')
+        # only new drops are reported
+        self.assertEqual(sum('dropped' in line for line in lines), 1)
+
+    def test_lazy_start_and_fork(self):
+        handler = QueuedNdjsonHandler(BytesIO())
+        self.add_handler(handler)
+        self.assertIsNone(handler.listener)
+        self.logger.warning('message')
+        listener, pid = handler.listener, os.getpid()
+        self.addCleanup(listener.stop)
+        with mock.patch('os.getpid', return_value=pid + 1):
+            self.logger.warning('message')
+        self.addCleanup(handler.listener.stop)
+        self.assertIsNot(handler.listener, listener)
+        self.assertIsNot(handler.queue, listener.queue)
+
+    def test_stop_dead_thread(self):
+        listener = NdjsonQueueListener(queue.Queue(1), BytesIO())
+        listener.start()
+        listener.queue.put(None)
+        listener._thread.join()
+        # thread is gone and the queue is full, stop must not hang
+        listener.queue.put('record')
+        listener.stop(timeout=0.1)
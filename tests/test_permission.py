@@ -1,4 +1,11 @@
-from django.test import TestCase
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+
+from simple_django_api.permissions import (LoginRequired, PermissionTable,
+                                           login_required, stateless)
+from simple_django_api.views import APIView
+
+from .demo_app.permissions import BasicAuthRequired
 
 
 class PermissionTestCase(TestCase):
@@ -22,3 +29,62 @@ class PermissionTestCase(TestCase):
         response = self.client.get('/blogs/1')
         resp_data = response.json()
         self.assertEqual(resp_data['pk'], 1)
+
+
+class PermissionTableTestCase(SimpleTestCase):
+    def test_method_lookup(self):
+        table = PermissionTable(APIView, {
+            'get': login_required,
+            'POST': LoginRequired,
+        })
+        self.assertEqual(len(table.get('GET')), 1)
+        self.assertEqual(len(table.get('post')), 1)
+        self.assertEqual(table.get('DELETE'), ())
+
+    def test_stateless_checker_cached(self):
+        @stateless
+        class StatelessLoginRequired(LoginRequired):
+            pass
+
+        table = PermissionTable(APIView, {'GET': [StatelessLoginRequired]})
+        (perm, checker), = table.get('GET')
+        self.assertIs(perm, StatelessLoginRequired)
+        self.assertIsInstance(checker, StatelessLoginRequired)
+        self.assertIs(checker.view_cls, APIView)
+        self.assertFalse(hasattr(checker, 'view'))
+        self.assertIs(table.get('GET')[0][1], checker)
+
+    def test_stateful_checker_not_cached(self):
+        table = PermissionTable(APIView, {'GET': BasicAuthRequired})
+        self.assertEqual(table.get('GET'), ((BasicAuthRequired, None), ))
+
+    def test_stateless_not_inherited(self):
+        @stateless
+        class Parent(LoginRequired):
+            pass
+
+        class Child(Parent):
+            def __call__(self, request, **kwargs):
+                return self.view.kwargs
+
+        table = PermissionTable(APIView, {'GET': [Child]})
+        self.assertEqual(table.get('GET'), ((Child, None), ))
+        view = APIView()
+        self.assertIs(Child(view).view, view)
+
+    def test_rebuild_on_setting_changed(self):
+        table = PermissionTable(APIView)
+        self.assertEqual(table.get('GET'), ())
+        with override_settings(API_DEFAULT_PERMS=[LoginRequired]):
+            self.assertEqual(table.get('GET')[0][0], LoginRequired)
+        self.assertEqual(table.get('GET'), ())
+
+    def test_table_built_once(self):
+        view = APIView()
+        request = RequestFactory().get('/')
+        list(view._get_perm_checkers(request))
+        table = view.perm_table
+        list(view._get_perm_checkers(request))
+        self.assertIs(view.perm_table, table)
+        self.assertIsNotNone(APIView.as_view(perm_table=None).view_initkwargs[
+            'perm_table'])
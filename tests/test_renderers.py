@@ -0,0 +1,137 @@
+from unittest import skipIf
+
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+
+from simple_django_api import compat, renderers
+from simple_django_api.response import JsonResponse
+from simple_django_api.views import APIView
+
+
+class TextRenderer(renderers.BaseRenderer):
+    media_type = 'text/plain'
+
+    def render(self, data, **options):
+        return str(data).encode('utf8')
+
+
+class NegotiateTestCase(SimpleTestCase):
+    def test_default(self):
+        for accept in ['', '*/*', 'application/*', 'text/html',
+                       '*/*; q=0, application/json']:
+            self.assertIsInstance(renderers.negotiate(accept),
+                                  renderers.JsonRenderer)
+
+    def test_not_acceptable(self):
+        for accept in ['application/json; q=0', '*/*; q=0',
+                       'text/html, application/json; q=0']:
+            self.assertIsNone(renderers.negotiate(accept))
+
+    def test_excluded_by_specific_type(self):
+        path = 'tests.test_renderers.TextRenderer'
+        with override_settings(API_RENDERERS={'text/plain': path}):
+            self.assertNotIsInstance(
+                renderers.negotiate('application/json; q=0, */*'),
+                renderers.JsonRenderer)
+
+    @skipIf(compat.msgpack is None, 'msgpack not installed')
+    def test_quality(self):
+        renderer = renderers.negotiate(
+            'application/json; q=0.5, application/msgpack')
+        self.assertIsInstance(renderer, renderers.MsgpackRenderer)
+        renderer = renderers.negotiate(
+            'application/json, application/msgpack')
+        self.assertIsInstance(renderer, renderers.JsonRenderer)
+
+    def test_accepts(self):
+        self.assertTrue(renderers.accepts('', 'application/x-ndjson'))
+        self.assertTrue(renderers.accepts('text/html', 'application/json'))
+        self.assertFalse(
+            renderers.accepts('*/*, application/json; q=0',
+                              'application/json'))
+
+    def test_cached(self):
+        renderers.negotiate.cache_clear()
+        renderers.negotiate('application/json')
+        renderers.negotiate('application/json')
+        self.assertEqual(renderers.negotiate.cache_info().hits, 1)
+
+    def test_setting(self):
+        path = 'tests.test_renderers.TextRenderer'
+        with override_settings(API_RENDERERS={'text/plain': path}):
+            renderer = renderers.negotiate('text/*')
+            self.assertIsInstance(renderer, TextRenderer)
+            response = JsonResponse({'a': 1}, renderer=renderer)
+            self.assertEqual(response['Content-Type'], 'text/plain')
+            self.assertEqual(response.content, b"{'a': 1}")
+        self.assertIsInstance(renderers.negotiate('text/*'),
+                              renderers.JsonRenderer)
+
+
+class NegotiationViewTestCase(TestCase):
+    @skipIf(compat.msgpack is None, 'msgpack not installed')
+    def test_msgpack(self):
+        response = self.client.get('/blogs/1',
+                                   HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(response['Vary'], 'Accept')
+        self.assertEqual(compat.msgpack.unpackb(response.content), {'pk': 1})
+
+    @skipIf(compat.cbor2 is None, 'cbor2 not installed')
+    def test_cbor(self):
+        response = self.client.get('/blogs/1', HTTP_ACCEPT='application/cbor')
+        self.assertEqual(response['Content-Type'], 'application/cbor')
+        self.assertEqual(compat.cbor2.loads(response.content), {'pk': 1})
+
+        response = self.client.get('/basic_auth',
+                                   HTTP_ACCEPT='application/cbor')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(compat.cbor2.loads(response.content),
+                         {'detail': 'basic_auth required'})
+
+    def test_json(self):
+        response = self.client.get('/blogs/1', HTTP_ACCEPT='text/html')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json(), {'pk': 1})
+
+    def test_not_acceptable(self):
+        response = self.client.get('/blogs/1',
+                                   HTTP_ACCEPT='application/json; q=0')
+        self.assertEqual(response.status_code, 406)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['Vary'], 'Accept')
+
+    def test_not_acceptable_before_handler(self):
+        calls = []
+
+        class CreateView(APIView):
+            def post(self, request):
+                calls.append(request)
+                return {'created': True}
+
+        request = RequestFactory().post('/',
+                                        HTTP_ACCEPT='application/json; q=0')
+        response = CreateView.as_view()(request)
+        self.assertEqual(response.status_code, 406)
+        self.assertEqual(calls, [])
+
+    def test_stream(self):
+        response = self.client.get('/numbers/3',
+                                   HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['Vary'], 'Accept')
+        response = self.client.get('/numbers/3',
+                                   HTTP_ACCEPT='application/json; q=0')
+        self.assertEqual(response.status_code, 406)
+        self.assertEqual(response['Vary'], 'Accept')
+
+    def test_error_vary(self):
+        response = self.client.get('/auth')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['Vary'], 'Accept')
+
+    def test_async_error_vary(self):
+        response = self.client.get('/async/blogs/0')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Vary'], 'Accept')
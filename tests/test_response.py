@@ -0,0 +1,177 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from simple_django_api import exceptions
+from simple_django_api.renderers import JsonRenderer
+from simple_django_api.response import (JsonResponse, NdjsonResponse,
+                                        StreamingJsonResponse,
+                                        get_error_response_cache)
+
+User = get_user_model()
+
+
+def read_streaming(response):
+    return b''.join(response.streaming_content)
+
+
+class StreamingJsonResponseTestCase(SimpleTestCase):
+    def test_array(self):
+        for count in [0, 1, 3, 4, 10]:
+            response = StreamingJsonResponse(iter(range(count)), chunk_size=2)
+            self.assertEqual(json.loads(read_streaming(response)),
+                             list(range(count)))
+
+    def test_envelope(self):
+        response = StreamingJsonResponse(iter(range(3)), envelope='results')
+        self.assertEqual(json.loads(read_streaming(response)),
+                         {'results': [0, 1, 2]})
+
+        response = StreamingJsonResponse(iter(range(3)),
+                                         envelope='results',
+                                         extra={'count': 3})
+        self.assertEqual(json.loads(read_streaming(response)), {
+            'count': 3,
+            'results': [0, 1, 2]
+        })
+
+
+    def test_error(self):
+        def items():
+            yield from range(3)
+            raise ValueError()
+
+        response = StreamingJsonResponse(items(), chunk_size=2)
+        self.assertEqual(read_streaming(response), b'[0, 1, 2')
+
+    def test_error_on_first_item(self):
+        def items():
+            raise ValueError()
+            yield
+
+        with self.assertRaises(ValueError):
+            StreamingJsonResponse(items())
+
+
+class StreamingViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            User.objects.create_user(f'user{i}')
+
+    def test_queryset(self):
+        response = self.client.get('/users/export')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = json.loads(read_streaming(response))
+        self.assertEqual([item['username'] for item in data],
+                         [f'user{i}' for i in range(5)])
+
+    def test_generator(self):
+        response = self.client.get('/numbers/3')
+        self.assertTrue(response.streaming)
+        self.assertEqual(json.loads(read_streaming(response)),
+                         {'results': [0, 1, 2]})
+
+    def test_error_before_output(self):
+        with self.assertLogs('tests.streaming', 'WARNING'):
+            response = self.client.get('/failing/numbers/0')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.streaming)
+
+    def test_error_while_streaming(self):
+        response = self.client.get('/failing/numbers/3')
+        self.assertEqual(response.status_code, 200)
+        with self.assertLogs('tests.streaming', 'WARNING') as logs:
+            data = json.loads(read_streaming(response))
+        self.assertEqual(data, {
+            'results': [0, 1, 2],
+            'error': {'detail': 'stream interrupted'}
+        })
+        self.assertIn('NotFound', logs.records[0].getMessage())
+
+    def test_async_queryset(self):
+        with self.assertLogs('simple_django_api.views', 'ERROR'):
+            response = self.client.get('/async/users/export')
+        self.assertEqual(response.status_code, 500)
+
+
+class NdjsonResponseTestCase(SimpleTestCase):
+    def test_lines(self):
+        for count in [0, 1, 3, 4]:
+            response = NdjsonResponse(iter(range(count)), chunk_size=2)
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            content = read_streaming(response)
+            self.assertEqual(content.count(b'\n'), count)
+            self.assertEqual(
+                [json.loads(line) for line in content.splitlines()],
+                list(range(count)))
+
+    def test_error(self):
+        def items():
+            yield 1
+            raise ValueError()
+
+        on_error = mock.Mock()
+        response = NdjsonResponse(items(), on_error=on_error)
+        content = read_streaming(response)
+        self.assertEqual([json.loads(line) for line in content.splitlines()],
+                         [1, {'error': {'detail': 'stream interrupted'}}])
+        self.assertIsInstance(on_error.call_args[0][0], ValueError)
+
+
+class ErrorResponseCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        get_error_response_cache().clear()
+
+    def test_cached(self):
+        cache = get_error_response_cache()
+        first = JsonResponse.from_exception(exceptions.NotFound())
+        second = JsonResponse.from_exception(exceptions.NotFound())
+        self.assertIsNot(first, second)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(second.status_code, 404)
+        self.assertEqual(second['Content-Type'], 'application/json')
+        self.assertEqual(second.content, first.content)
+        second['X-Extra'] = '1'
+        self.assertFalse(first.has_header('X-Extra'))
+
+    def test_subclass_init(self):
+        class TracedResponse(JsonResponse):
+            def __init__(self, data, **kwargs):
+                super().__init__(data, **kwargs)
+                self['X-Trace'] = 'on'
+
+        for _ in range(2):
+            response = TracedResponse.from_exception(exceptions.NotFound())
+            self.assertEqual(response['X-Trace'], 'on')
+            self.assertEqual(response.status_code, 404)
+        self.assertEqual(get_error_response_cache().stats()['hits'], 1)
+
+    def test_key(self):
+        hints = [
+            json.loads(JsonResponse.from_exception(exc).content)['detail']
+            for exc in [
+                exceptions.NotFound(user_hint='a'),
+                exceptions.NotFound(user_hint='b'),
+                exceptions.NotFound(user_hint='a'),
+            ]
+        ]
+        self.assertEqual(hints, ['a', 'b', 'a'])
+        response = JsonResponse.from_exception(exceptions.Forbidden(),
+                                               renderer=JsonRenderer())
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(len(get_error_response_cache()), 3)
+
+    def test_uncached(self):
+        exc = exceptions.ParamsError(user_hint={'name': ['required']})
+        response = JsonResponse.from_exception(exc)
+        self.assertEqual(json.loads(response.content),
+                         {'name': ['required']})
+        self.assertEqual(len(get_error_response_cache()), 0)
+        with self.settings(API_ERROR_RESPONSE_CACHE_SIZE=0):
+            self.assertIsNone(get_error_response_cache())
+            response = JsonResponse.from_exception(exceptions.NotFound())
+            self.assertEqual(response.status_code, 404)
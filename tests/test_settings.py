@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase, override_settings
+
+from simple_django_api.jwt import auth
+from simple_django_api.settings import settings
+
+
+class FallbackSettingsTestCase(SimpleTestCase):
+    def test_default(self):
+        self.assertIsNone(settings.API_JSON_BACKEND)
+        self.assertEqual(settings.SECRET_KEY, 'not very secret in tests')
+        with self.assertRaises(AttributeError):
+            settings.API_UNKNOWN
+
+    def test_snapshot(self):
+        snapshot = settings.snapshot()
+        self.assertIs(settings.snapshot(), snapshot)
+        with self.assertRaises(TypeError):
+            snapshot['API_JSON_BACKEND'] = 'stdlib'
+        with override_settings(API_JSON_BACKEND='stdlib'):
+            self.assertEqual(settings.API_JSON_BACKEND, 'stdlib')
+        self.assertIsNone(settings.API_JSON_BACKEND)
+
+    def test_jwt_config(self):
+        config = auth.get_jwt_config()
+        self.assertIs(auth.get_jwt_config(), config)
+        self.assertIs(auth.JWT_CONFIG, config)
+        with override_settings(API_JWT_AUTH_COOKIE='token'):
+            self.assertEqual(auth.get_jwt_config().auth_cookie, 'token')
+        self.assertEqual(auth.get_jwt_config().auth_cookie, '')